@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,6 +20,8 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    # REDIS_URL names any node of a Redis Cluster; room events then use sharded pub/sub
+    REDIS_CLUSTER: bool = False
 
     # S3
     S3_ENDPOINT: str
@@ -26,13 +30,72 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: str
     S3_REGION: str = "us-east-1"
 
+    # Local disk cache for objects served through the API
+    FILE_CACHE_DIR: str = ".cache/files"
+    FILE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # 1 GiB
+
+    # Messages sent with a client_msg_id are remembered this long, up to this many, so
+    # most retries are answered without a query; the database catches the rest
+    CLIENT_MSG_ID_WINDOW_S: int = 300
+    CLIENT_MSG_ID_WINDOW_SIZE: int = 10_000
+
+    # Attachments
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024  # 10 MiB
+    # Attachments uploaded but not sent in a message are deleted after this long
+    UNSENT_ATTACHMENT_TTL_S: int = 24 * 3600
+    ATTACHMENT_CLEANUP_INTERVAL_S: int = 3600
+
+    # WebSocket
+    # Reaction changes for one message are coalesced into one frame per window
+    REACTION_BROADCAST_WINDOW_MS: int = 200
+    # For connections that opt into batching, frames queued within the window go out
+    # as one array frame; a full batch is sent without waiting
+    WS_BATCH_WINDOW_MS: int = 5
+    WS_BATCH_MAX_FRAMES: int = 50
+    # Message frames sent to a connection that opted into acks stay pending until acked,
+    # up to this many per user (oldest dropped first), and are redelivered on reconnect;
+    # a disconnected user's pending frames are kept this long
+    WS_PENDING_MAX_FRAMES: int = 500
+    WS_PENDING_TTL_S: int = 300
+    # Most messages per room in the "catch_up" frame sent for the auth frame's last_seen
+    WS_CATCH_UP_ROOM_LIMIT: int = 50
+    # Carries room events between nodes: "redis", "postgres" (LISTEN/NOTIFY, for small
+    # deployments without Redis) or "memory" (single process only)
+    MESSAGE_BUS: Literal["redis", "postgres", "memory"] = "redis"
+    # "room": one Redis channel per room with local subscribers. "node": one channel per
+    # node, and publishers send to each node registered for the room
+    PUBSUB_ROUTING: Literal["room", "node"] = "room"
+    # Identifies this node's channel in "node" routing; random per process when empty
+    NODE_ID: str = ""
+    # How often a node re-registers its rooms, restoring entries pruned while it was away
+    NODE_REGISTRY_REFRESH_S: int = 30
+
     # Security
     SECRET_KEY: str = "your-secret-key-here"  # Change in production
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    # Users allowed to call the /debug endpoints
+    ADMIN_USERNAMES: list[str] = []
+    # Threads hashing and checking passwords; more requests queue for a free one
+    BCRYPT_POOL_SIZE: int = 4
+
+    # Event-loop monitor: lag is sampled every interval; lag over the threshold is
+    # recorded as a stall together with the stack that was blocking the loop
+    LOOP_MONITOR_INTERVAL_MS: int = 100
+    LOOP_STALL_THRESHOLD_MS: int = 100
+    LOOP_STALL_HISTORY: int = 50
+    LOOP_STALL_STACK_DEPTH: int = 30
+
+    # On-demand sampling profiler (/debug/profile)
+    PROFILER_MAX_SECONDS: int = 60
 
     # Environment
     ENVIRONMENT: str = "development"
 
+    # Query diagnostics: warn when one request or WebSocket frame issues more queries
+    # than this, or the same statement this many times (a likely N+1)
+    QUERY_COUNT_WARN_THRESHOLD: int = 20
+    QUERY_REPEAT_WARN_THRESHOLD: int = 5
+
     model_config = SettingsConfigDict(
         case_sensitive=True,
         env_file=".env",
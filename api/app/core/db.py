@@ -1,6 +1,7 @@
-from tortoise import Tortoise
+from tortoise import Tortoise, connections
 
 from app.core.config import settings
+from app.core.metrics import instrument_db_client
 
 TORTOISE_ORM = {
     "connections": {"default": settings.DATABASE_URL},
@@ -16,6 +17,7 @@ TORTOISE_ORM = {
 async def init_db():
     """Initialize database connection."""
     await Tortoise.init(config=TORTOISE_ORM)
+    instrument_db_client(type(connections.get("default")))
     await Tortoise.generate_schemas()
 
 
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+
+from app.core.config import settings
+from app.core.query_stats import create_untracked_task
+from app.core.s3 import s3_service
+
+logger = structlog.get_logger()
+
+TMP_SUFFIX = ".tmp"
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    path: Path
+    size: int
+    etag: str
+
+
+def _cache_key(object_name: str) -> str:
+    return hashlib.sha256(object_name.encode()).hexdigest()
+
+
+def _file_digest(path: Path) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "blake2b").hexdigest()[:32]
+
+
+class FileCache:
+    """Size-bounded on-disk LRU cache in front of `S3Service.download_file`.
+
+    Files are stored as `<sha256(object_name)>.<content digest>`, so the index can be
+    rebuilt from the directory listing after a restart. Concurrent misses for the same
+    object share a single S3 download.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: dict[str, asyncio.Task[CachedFile]] = {}
+
+    async def initialize(self) -> None:
+        """Create the cache directory and rebuild the index from disk."""
+        await asyncio.to_thread(self._load_index)
+        logger.info(
+            "file_cache_loaded",
+            directory=str(self.directory),
+            entries=len(self._entries),
+            total_bytes=self._total_bytes,
+        )
+
+    def _load_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.iterdir():
+            # Leftovers of downloads interrupted by a restart
+            if path.name.endswith(TMP_SUFFIX):
+                path.unlink(missing_ok=True)
+                continue
+            files.append((path, path.stat()))
+
+        # Least recently used first, so the OrderedDict keeps LRU order
+        files.sort(key=lambda item: item[1].st_atime)
+        for path, stat in files:
+            key, _, digest = path.name.partition(".")
+            # An older copy of the same object, left by a download that replaced it
+            self._remove(key)
+            self._add(key, CachedFile(path=path, size=stat.st_size, etag=f'"{digest}"'))
+        self._evict()
+
+    async def get(self, object_name: str) -> CachedFile:
+        """Return the cached copy of an object, downloading it on a miss."""
+        key = _cache_key(object_name)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = create_untracked_task(self._fetch(object_name, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so that one client disconnecting does not cancel the shared download
+        return await asyncio.shield(task)
+
+    def invalidate(self, object_name: str) -> None:
+        """Drop an object from the cache."""
+        key = _cache_key(object_name)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size
+        entry.path.unlink(missing_ok=True)
+
+    async def _fetch(self, object_name: str, key: str) -> CachedFile:
+        tmp_path = self.directory / f"{key}.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        try:
+            await s3_service.download_file(object_name, str(tmp_path))
+            digest = await asyncio.to_thread(_file_digest, tmp_path)
+            path = self.directory / f"{key}.{digest}"
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        entry = CachedFile(path=path, size=path.stat().st_size, etag=f'"{digest}"')
+        self._remove(key, keep_path=path)
+        self._add(key, entry)
+        self._evict()
+
+        logger.info("file_cache_miss", object_name=object_name, size=entry.size)
+        return entry
+
+    def _add(self, key: str, entry: CachedFile) -> None:
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+
+    def _remove(self, key: str, keep_path: Path | None = None) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size
+        if entry.path != keep_path:
+            entry.path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            logger.debug("file_cache_evicted", key=key)
+
+
+file_cache = FileCache(settings.FILE_CACHE_DIR, settings.FILE_CACHE_MAX_BYTES)
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+from datetime import UTC, datetime
+
+from structlog import get_logger
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = get_logger()
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and captures what blocked the loop.
+
+    A coroutine sleeps for a fixed interval and records how late it wakes up. A
+    watchdog thread notices when that wake-up is overdue and, while the loop is still
+    blocked, snapshots the loop thread's stack and the task that was running.
+    """
+
+    def __init__(self):
+        self.stalls: deque[dict] = deque(maxlen=settings.LOOP_STALL_HISTORY)
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._snapshot: dict | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start measuring on the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    async def _measure(self) -> None:
+        interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+        threshold = settings.LOOP_STALL_THRESHOLD_MS / 1000
+
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            snapshot, self._snapshot = self._snapshot, None
+            if lag < threshold:
+                continue
+
+            # Short stalls can end before the watchdog looks; they are recorded without a stack
+            stall = snapshot or {"at": datetime.now(UTC).isoformat(), "task": None, "stack": []}
+            stall["lag_ms"] = round(lag * 1000, 1)
+            self.stalls.append(stall)
+            EVENT_LOOP_STALLS.inc()
+            logger.warning(
+                "event_loop_stall",
+                lag_ms=stall["lag_ms"],
+                task=stall["task"],
+                where=stall["stack"][-1] if stall["stack"] else None,
+            )
+
+    def _watch(self) -> None:
+        interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+        threshold = settings.LOOP_STALL_THRESHOLD_MS / 1000
+
+        while not self._stopped.wait(interval / 2):
+            overdue = time.monotonic() - self._heartbeat - interval
+            if overdue >= threshold and self._snapshot is None:
+                self._snapshot = self._capture()
+
+    def _capture(self) -> dict:
+        """Snapshot the loop thread while it is blocked."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = []
+        if frame is not None:
+            stack = [
+                f"{entry.filename}:{entry.lineno} {entry.name}"
+                for entry in traceback.extract_stack(frame, limit=settings.LOOP_STALL_STACK_DEPTH)
+            ]
+
+        task = asyncio.current_task(self._loop)
+        task_name = None
+        if task is not None:
+            coro = task.get_coro()
+            task_name = f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+        return {"at": datetime.now(UTC).isoformat(), "task": task_name, "stack": stack}
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,444 @@
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+from redis.asyncio import ConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import PubSub
+from redis.asyncio.cluster import ClusterNode
+from structlog import get_logger
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.query_stats import create_untracked_task
+from app.core.redis import redis_service
+
+logger = get_logger()
+
+EventHandler = Callable[[str | bytes], Awaitable[None]]
+
+# Publishes to every node registered for a room, pruning nodes no one listens for
+# anymore. KEYS[1]: the room's node set; ARGV[1]: node channel prefix; ARGV[2]: payload
+PUBLISH_TO_NODES_LUA = """
+local delivered = 0
+for _, node in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if redis.call('PUBLISH', ARGV[1] .. node, ARGV[2]) > 0 then
+        delivered = delivered + 1
+    else
+        redis.call('SREM', KEYS[1], node)
+    end
+end
+return delivered
+"""
+
+ROOM_CHANNEL_PREFIX = "room:"
+NODE_CHANNEL_PREFIX = "node:"
+
+# Queued by a shard reader to have the sharded bus reload the slot map and resubscribe
+RESUBSCRIBE = object()
+
+NOTIFY_CHANNEL = "chat_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; larger events are split
+NOTIFY_CHUNK_BYTES = 7800
+NOTIFY_CHUNK_MARKER = "#"
+# Bytes of the form 0b10xxxxxx continue a multi-byte UTF-8 character
+UTF8_CONTINUATION_MASK = 0xC0
+UTF8_CONTINUATION = 0x80
+
+
+def room_channel(room_id: int) -> str:
+    return f"{ROOM_CHANNEL_PREFIX}{room_id}"
+
+
+def room_nodes_key(room_id: int) -> str:
+    """Set of nodes with subscribers in the room, for "node" routing."""
+    return f"room_nodes:{room_id}"
+
+
+class MessageBus(ABC):
+    """Carries room events between the nodes serving WebSocket connections.
+
+    `add_rooms` and `remove_rooms` are called when a room gains its first or loses its
+    last local subscriber; a backend may deliver events of other rooms too, which the
+    caller filters out.
+    """
+
+    async def connect(self) -> None:  # noqa: B027
+        """Open the backend's connections; optional."""
+
+    @abstractmethod
+    async def listen(self, handler: EventHandler) -> None:
+        """Deliver published events to `handler` until cancelled."""
+
+    @abstractmethod
+    async def publish(self, room_id: int, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def add_rooms(self, room_ids: list[int]) -> None:
+        pass
+
+    @abstractmethod
+    async def remove_rooms(self, room_ids: list[int]) -> None:
+        pass
+
+    async def close(self) -> None:  # noqa: B027
+        """Close the backend's connections; optional."""
+
+    @abstractmethod
+    def channel_count(self) -> int:
+        """Channels this node listens on, for the pubsub_channels gauge."""
+
+
+class InMemoryMessageBus(MessageBus):
+    """Delivers events within the process, for single-process runs and tests."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async def listen(self, handler: EventHandler) -> None:
+        while True:
+            data = await self._queue.get()
+            await handler(data)
+
+    async def publish(self, room_id: int, data: bytes) -> None:
+        self._queue.put_nowait(data)
+
+    async def add_rooms(self, room_ids: list[int]) -> None:
+        # Every event is delivered; the caller filters by room
+        pass
+
+    async def remove_rooms(self, room_ids: list[int]) -> None:
+        pass
+
+    def channel_count(self) -> int:
+        return 0
+
+
+class RedisMessageBus(MessageBus):
+    """Redis pub/sub, routed per room or per node (see PUBSUB_ROUTING)."""
+
+    def __init__(self):
+        self.redis_client = None
+        self.pubsub = None
+        self.node_id = settings.NODE_ID or uuid.uuid4().hex[:12]
+        self._publish_to_nodes = None
+        self._rooms: set[int] = set()
+        self._registry_refreshed_at = 0.0
+
+    async def connect(self) -> None:
+        self.redis_client = await redis_service.get_async_redis()
+        self.pubsub = self.redis_client.pubsub()
+        # Subscribe to a dummy channel to initialize pubsub
+        await self.pubsub.subscribe("dummy_channel")
+        if settings.PUBSUB_ROUTING == "node":
+            self._publish_to_nodes = self.redis_client.register_script(PUBLISH_TO_NODES_LUA)
+            await self.pubsub.subscribe(NODE_CHANNEL_PREFIX + self.node_id)
+            self._registry_refreshed_at = time.monotonic()
+            logger.info("pubsub_node_routing", node_id=self.node_id)
+
+    async def listen(self, handler: EventHandler) -> None:
+        while True:
+            try:
+                # Get message from Redis
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message["type"] == "message":
+                    await handler(message["data"])
+                await self._refresh_registry()
+            except Exception as e:
+                logger.error("redis_listener_error", error=str(e))
+                await asyncio.sleep(1)  # Wait before retrying
+
+    async def publish(self, room_id: int, data: bytes) -> None:
+        if settings.PUBSUB_ROUTING == "node":
+            await self._publish_to_nodes(
+                keys=[room_nodes_key(room_id)], args=[NODE_CHANNEL_PREFIX, data]
+            )
+        else:
+            await self.redis_client.publish(room_channel(room_id), data)
+
+    async def add_rooms(self, room_ids: list[int]) -> None:
+        self._rooms.update(room_ids)
+        if settings.PUBSUB_ROUTING == "node":
+            await self._register(room_ids)
+        else:
+            await self.pubsub.subscribe(*map(room_channel, room_ids))
+
+    async def remove_rooms(self, room_ids: list[int]) -> None:
+        self._rooms.difference_update(room_ids)
+        if settings.PUBSUB_ROUTING == "node":
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for room_id in room_ids:
+                    pipe.srem(room_nodes_key(room_id), self.node_id)
+                await pipe.execute()
+        else:
+            await self.pubsub.unsubscribe(*map(room_channel, room_ids))
+
+    async def _register(self, room_ids: list[int]) -> None:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for room_id in room_ids:
+                pipe.sadd(room_nodes_key(room_id), self.node_id)
+            await pipe.execute()
+
+    async def _refresh_registry(self) -> None:
+        """Re-register this node's rooms now and then, in "node" routing.
+
+        Publishers prune nodes whose channel had no listener, e.g. while this node's
+        pub/sub connection was reconnecting; this restores those entries.
+        """
+        if settings.PUBSUB_ROUTING != "node" or not self._rooms:
+            return
+        now = time.monotonic()
+        if now - self._registry_refreshed_at < settings.NODE_REGISTRY_REFRESH_S:
+            return
+        self._registry_refreshed_at = now
+        await self._register(list(self._rooms))
+
+    async def close(self) -> None:
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+
+    def channel_count(self) -> int:
+        return len(self.pubsub.channels) if self.pubsub else 0
+
+
+class ShardedRedisMessageBus(MessageBus):
+    """Redis Cluster sharded pub/sub (SPUBLISH/SSUBSCRIBE), for REDIS_CLUSTER.
+
+    A classic PUBLISH is forwarded to every node of a cluster; a sharded channel lives
+    on the shard owning its hash slot, so a room's events stay within one shard. This
+    node keeps one pub/sub connection per primary it has rooms on, each read by its own
+    task. When a slot moves, Redis drops its subscriptions; the slot map is then
+    reloaded and every room subscribed again on its new shard.
+    """
+
+    def __init__(self):
+        self.cluster = None
+        self._shards: dict[str, PubSub] = {}
+        self._readers: dict[str, asyncio.Task] = {}
+        self._rooms: set[int] = set()
+        self._events: asyncio.Queue[str | object] = asyncio.Queue()
+
+    async def connect(self) -> None:
+        self.cluster = await redis_service.get_async_redis()
+        if settings.PUBSUB_ROUTING == "node":
+            logger.warning("pubsub_node_routing_ignored", reason="sharded pub/sub routes by room")
+
+    async def listen(self, handler: EventHandler) -> None:
+        while True:
+            item = await self._events.get()
+            try:
+                if item is RESUBSCRIBE:
+                    await self._resubscribe()
+                else:
+                    await handler(item)
+            except Exception as e:
+                logger.error("redis_listener_error", error=str(e))
+                if item is RESUBSCRIBE:
+                    await asyncio.sleep(1)  # Wait before retrying
+                    self._events.put_nowait(RESUBSCRIBE)
+
+    async def publish(self, room_id: int, data: bytes) -> None:
+        # The async RedisCluster has no spublish(); send it to the channel's shard
+        channel = room_channel(room_id)
+        await self.cluster.execute_command(
+            "SPUBLISH", channel, data, target_nodes=self.cluster.get_node_from_key(channel)
+        )
+
+    async def add_rooms(self, room_ids: list[int]) -> None:
+        self._rooms.update(room_ids)
+        await self._subscribe(room_ids)
+
+    async def remove_rooms(self, room_ids: list[int]) -> None:
+        self._rooms.difference_update(room_ids)
+        for shard, channels in self._by_shard(room_ids).items():
+            if shard.name in self._shards:
+                await self._shards[shard.name].execute_command("SUNSUBSCRIBE", *channels)
+
+    def _by_shard(self, room_ids: list[int]) -> dict[ClusterNode, list[str]]:
+        channels_by_shard: dict[ClusterNode, list[str]] = {}
+        for room_id in room_ids:
+            channel = room_channel(room_id)
+            channels_by_shard.setdefault(self.cluster.get_node_from_key(channel), []).append(
+                channel
+            )
+        return channels_by_shard
+
+    async def _subscribe(self, room_ids: list[int]) -> None:
+        for shard, channels in self._by_shard(room_ids).items():
+            pubsub = await self._shard_pubsub(shard)
+            await pubsub.execute_command("SSUBSCRIBE", *channels)
+
+    async def _shard_pubsub(self, shard: ClusterNode) -> PubSub:
+        if shard.name not in self._shards:
+            # A connection of its own to the shard, with the cluster's credentials
+            pool = ConnectionPool(
+                connection_class=shard.connection_class, **shard.connection_kwargs
+            )
+            pubsub = AsyncRedis(connection_pool=pool).pubsub()
+            # Subscribe to a dummy channel to initialize pubsub
+            await pubsub.subscribe("dummy_channel")
+            pubsub.connection.register_connect_callback(self._on_shard_reconnect)
+            self._shards[shard.name] = pubsub
+            self._readers[shard.name] = create_untracked_task(self._read_shard(pubsub))
+        return self._shards[shard.name]
+
+    def _on_shard_reconnect(self, connection) -> None:
+        # redis-py restores classic subscriptions on reconnect, but not sharded ones
+        self._events.put_nowait(RESUBSCRIBE)
+
+    async def _read_shard(self, pubsub: PubSub) -> None:
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message["type"] == "smessage":
+                    self._events.put_nowait(message["data"])
+                elif message["type"] == "sunsubscribe" and (
+                    int(message["channel"].removeprefix(ROOM_CHANNEL_PREFIX)) in self._rooms
+                ):
+                    # Dropped by the server: the channel's slot moved to another shard
+                    self._events.put_nowait(RESUBSCRIBE)
+                    return
+        except Exception as e:
+            logger.error("redis_shard_reader_error", error=str(e))
+            self._events.put_nowait(RESUBSCRIBE)
+
+    async def _close_shards(self) -> None:
+        for reader in self._readers.values():
+            if reader is not asyncio.current_task():
+                reader.cancel()
+        for pubsub in self._shards.values():
+            await pubsub.aclose()
+            await pubsub.connection_pool.disconnect()
+        self._readers.clear()
+        self._shards.clear()
+
+    async def _resubscribe(self) -> None:
+        """Reload the slot map and subscribe every room again on its current shard."""
+        await self._close_shards()
+        await self.cluster.nodes_manager.initialize()
+        await self._subscribe(list(self._rooms))
+        logger.info("redis_shards_resubscribed", shards=len(self._shards), rooms=len(self._rooms))
+
+    async def close(self) -> None:
+        await self._close_shards()
+
+    def channel_count(self) -> int:
+        return len(self._rooms)
+
+
+def split_notify_payload(data: bytes) -> list[str]:
+    """Split an event into NOTIFY payloads, each under Postgres' size limit.
+
+    Small events are sent as they are. Larger ones are cut on UTF-8 character
+    boundaries into `#<event id>:<index>:<count>:` prefixed chunks.
+    """
+    if len(data) <= NOTIFY_CHUNK_BYTES:
+        return [data.decode()]
+
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = min(start + NOTIFY_CHUNK_BYTES, len(data))
+        # Never cut inside a multi-byte character
+        while end < len(data) and data[end] & UTF8_CONTINUATION_MASK == UTF8_CONTINUATION:
+            end -= 1
+        pieces.append(data[start:end].decode())
+        start = end
+
+    event_id = uuid.uuid4().hex[:12]
+    return [
+        f"{NOTIFY_CHUNK_MARKER}{event_id}:{index}:{len(pieces)}:{piece}"
+        for index, piece in enumerate(pieces)
+    ]
+
+
+class PostgresMessageBus(MessageBus):
+    """Postgres LISTEN/NOTIFY, for small deployments without Redis.
+
+    Every node listens on one channel and receives all events. Chunks of one event
+    are sent in one transaction, so they arrive together and in order.
+    """
+
+    def __init__(self):
+        self._connection: asyncpg.Connection | None = None
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._partial: dict[str, list[str]] = {}
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._queue.put_nowait(payload)
+
+    async def connect(self) -> None:
+        # LISTEN needs a connection of its own, outside the ORM pool
+        self._connection = await asyncpg.connect(settings.DATABASE_URL)
+        await self._connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        self._partial.clear()
+
+    async def listen(self, handler: EventHandler) -> None:
+        while True:
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    await self.connect()
+                try:
+                    payload = await asyncio.wait_for(self._queue.get(), timeout=1.0)
+                except TimeoutError:
+                    continue
+                data = self._reassemble(payload)
+                if data is not None:
+                    await handler(data)
+            except Exception as e:
+                logger.error("postgres_listener_error", error=str(e))
+                await asyncio.sleep(1)  # Wait before retrying
+
+    def _reassemble(self, payload: str) -> str | None:
+        if not payload.startswith(NOTIFY_CHUNK_MARKER):
+            return payload
+        event_id, index, count, piece = payload[1:].split(":", 3)
+        pieces = self._partial.setdefault(event_id, [])
+        pieces.append(piece)
+        if int(index) + 1 < int(count):
+            return None
+        del self._partial[event_id]
+        return "".join(pieces)
+
+    async def publish(self, room_id: int, data: bytes) -> None:
+        payloads = split_notify_payload(data)
+        if len(payloads) == 1:
+            await connections.get("default").execute_query(
+                "SELECT pg_notify($1, $2)", [NOTIFY_CHANNEL, payloads[0]]
+            )
+            return
+        async with in_transaction() as conn:
+            for payload in payloads:
+                await conn.execute_query("SELECT pg_notify($1, $2)", [NOTIFY_CHANNEL, payload])
+
+    async def add_rooms(self, room_ids: list[int]) -> None:
+        # Every node receives every event on the one channel
+        pass
+
+    async def remove_rooms(self, room_ids: list[int]) -> None:
+        pass
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+
+    def channel_count(self) -> int:
+        return 1 if self._connection is not None else 0
+
+
+def create_message_bus() -> MessageBus:
+    """The backend selected by MESSAGE_BUS."""
+    if settings.MESSAGE_BUS == "memory":
+        return InMemoryMessageBus()
+    if settings.MESSAGE_BUS == "postgres":
+        return PostgresMessageBus()
+    if settings.REDIS_CLUSTER:
+        return ShardedRedisMessageBus()
+    return RedisMessageBus()
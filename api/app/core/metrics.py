@@ -0,0 +1,141 @@
+import functools
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.query_stats import record_query
+
+# Every label below takes values from a fixed set (route templates, SQL verbs, S3
+# operation names) so the number of series stays bounded.
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+WS_CONNECTIONS = Gauge("websocket_connections", "Open WebSocket connections on this node")
+WS_SUBSCRIPTIONS = Gauge(
+    "websocket_room_subscriptions", "Room subscriptions held by WebSocket connections on this node"
+)
+
+WS_PENDING_FRAMES = Gauge(
+    "websocket_pending_frames", "Message frames sent to ack connections and not yet acknowledged"
+)
+WS_PENDING_DROPPED = Counter(
+    "websocket_pending_dropped_total",
+    "Unacknowledged frames dropped from a pending buffer",
+    ["reason"],
+)
+WS_REDELIVERED_FRAMES = Counter(
+    "websocket_redelivered_frames_total", "Unacknowledged frames sent again on reconnect"
+)
+
+PUBSUB_CHANNELS = Gauge("pubsub_channels", "Redis pub/sub channels this node is subscribed to")
+
+PUBSUB_LISTENER_LAG = Histogram(
+    "pubsub_listener_lag_seconds",
+    "Time from publishing a room event to the Redis listener picking it up",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PUBSUB_DELIVERY_LATENCY = Histogram(
+    "pubsub_publish_to_deliver_seconds",
+    "Time from publishing a room event to handing it to every local subscriber",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop runs a callback scheduled for a fixed time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Event-loop lag spikes over LOOP_STALL_THRESHOLD_MS"
+)
+
+DB_QUERIES = Counter("db_queries_total", "Database queries by SQL verb", ["operation"])
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database query latency by SQL verb", ["operation"]
+)
+
+S3_OPERATION_DURATION = Histogram(
+    "s3_operation_duration_seconds", "S3 call latency by operation", ["operation"]
+)
+
+BCRYPT_QUEUE_WAIT = Histogram(
+    "bcrypt_queue_wait_seconds",
+    "Time a password hash or check waits for a free bcrypt worker",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BCRYPT_DURATION = Histogram("bcrypt_duration_seconds", "Time spent hashing or checking a password")
+
+SQL_OPERATIONS = frozenset({"select", "insert", "update", "delete", "with"})
+
+
+class PrometheusMiddleware:
+    """Records the latency of every HTTP request, labelled by the matched route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def _sql_operation(query: str) -> str:
+    words = query.lstrip()[:7].split(None, 1)
+    verb = words[0].lower() if words else ""
+    return verb if verb in SQL_OPERATIONS else "other"
+
+
+def _timed_query(method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def wrapper(self, query: str, *args, **kwargs):
+        operation = _sql_operation(query)
+        started = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started
+            DB_QUERIES.labels(operation).inc()
+            DB_QUERY_DURATION.labels(operation).observe(duration)
+            record_query(query, duration)
+
+    wrapper.__instrumented__ = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def instrument_db_client(client_class: type) -> None:
+    """Count and time every query run through a Tortoise client class.
+
+    Transaction wrappers subclass the client and inherit the patched methods; the ones
+    they override themselves are patched as well.
+    """
+    for cls in (client_class, *client_class.__subclasses__()):
+        for name in ("execute_query", "execute_query_dict", "execute_insert", "execute_many"):
+            method = vars(cls).get(name)
+            if method is not None and not getattr(method, "__instrumented__", False):
+                setattr(cls, name, _timed_query(method))
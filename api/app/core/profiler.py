@@ -0,0 +1,47 @@
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename.rsplit("/", 1)[-1]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse_frame(frame: FrameType | None) -> list[str]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def sample_stacks(duration: float, interval: float) -> Counter[str]:
+    """Sample the stacks of every other thread for `duration` seconds.
+
+    Returns how often each stack was seen, keyed by the thread name followed by its
+    frames from the outermost in, joined with `;` (the collapsed-stack format read by
+    flamegraph.pl, speedscope and similar tools).
+    """
+    own_id = threading.get_ident()
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            thread_name = names.get(thread_id, str(thread_id)).replace(" ", "_")
+            stacks[";".join([thread_name, *_collapse_frame(frame)])] += 1
+        time.sleep(interval)
+
+    return stacks
+
+
+def format_collapsed(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
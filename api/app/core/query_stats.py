@@ -0,0 +1,125 @@
+import asyncio
+import re
+import time
+from collections import Counter
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from structlog import get_logger
+
+from app.core.config import settings
+
+logger = get_logger()
+
+# Literals are replaced so that the same statement with different ids counts as a repeat
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+@dataclass
+class QueryStats:
+    """Queries issued while handling one request or WebSocket frame."""
+
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def record(self, query: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[_LITERAL_RE.sub("?", query)] += 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Statements issued often enough to suggest an N+1 pattern, most frequent first."""
+        threshold = settings.QUERY_REPEAT_WARN_THRESHOLD
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def record_query(query: str, duration: float) -> None:
+    """Attribute a query to the request or frame currently being handled, if any."""
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(query, duration)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the queries issued inside the block, including by tasks it awaits.
+
+    Background work started from the block should use `create_untracked_task`, or
+    it keeps adding to these stats after the request or frame is done.
+    """
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+def create_untracked_task(coro: Coroutine) -> asyncio.Task:
+    """Start a task whose queries are not attributed to the current request or frame."""
+    # Tasks run in a copy of the caller's context, tracked stats included
+    context = copy_context()
+    context.run(current_query_stats.set, None)
+    return asyncio.create_task(coro, context=context)
+
+
+def report_query_stats(stats: QueryStats, kind: str, name: str, elapsed: float) -> None:
+    """Log a warning when a request or frame issued too many or repeated queries."""
+    if stats.count > settings.QUERY_COUNT_WARN_THRESHOLD:
+        logger.warning(
+            "too_many_queries",
+            kind=kind,
+            name=name,
+            queries=stats.count,
+            db_ms=round(stats.duration * 1000, 2),
+            total_ms=round(elapsed * 1000, 2),
+        )
+    for sql, times in stats.repeated()[:3]:
+        logger.warning("repeated_query", kind=kind, name=name, times=times, query=sql[:300])
+
+
+class QueryStatsMiddleware:
+    """Counts queries and DB time per HTTP request.
+
+    In development the counts are also returned as `X-DB-Query-Count` and
+    `X-DB-Query-Time-Ms` response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.add_headers = settings.ENVIRONMENT == "development"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.add_headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-query-time-ms", f"{stats.duration * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                report_query_stats(
+                    stats,
+                    "http",
+                    f"{scope['method']} {getattr(route, 'path', scope['path'])}",
+                    time.perf_counter() - started,
+                )
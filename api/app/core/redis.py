@@ -1,6 +1,7 @@
 import structlog
-from redis import Redis
+from redis import Redis, RedisCluster
 from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio import RedisCluster as AsyncRedisCluster
 
 from app.core.config import settings
 
@@ -9,8 +10,8 @@ logger = structlog.get_logger()
 
 class RedisService:
     _instance = None
-    _redis: Redis | None = None
-    _async_redis: AsyncRedis | None = None
+    _redis: Redis | RedisCluster | None = None
+    _async_redis: AsyncRedis | AsyncRedisCluster | None = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -18,17 +19,26 @@ class RedisService:
         return cls._instance
 
     @classmethod
-    def get_redis(cls) -> Redis:
+    def get_redis(cls) -> Redis | RedisCluster:
         if cls._redis is None:
-            cls._redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
-            logger.info("redis_connected", url=settings.REDIS_URL)
+            redis_class = RedisCluster if settings.REDIS_CLUSTER else Redis
+            cls._redis = redis_class.from_url(settings.REDIS_URL, decode_responses=True)
+            logger.info("redis_connected", url=settings.REDIS_URL, cluster=settings.REDIS_CLUSTER)
         return cls._redis
 
     @classmethod
-    async def get_async_redis(cls) -> AsyncRedis:
+    async def get_async_redis(cls) -> AsyncRedis | AsyncRedisCluster:
         if cls._async_redis is None:
-            cls._async_redis = AsyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
-            logger.info("async_redis_connected", url=settings.REDIS_URL)
+            if settings.REDIS_CLUSTER:
+                client = AsyncRedisCluster.from_url(settings.REDIS_URL, decode_responses=True)
+                # Load the slot map now rather than on the first command
+                await client.initialize()
+            else:
+                client = AsyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
+            cls._async_redis = client
+            logger.info(
+                "async_redis_connected", url=settings.REDIS_URL, cluster=settings.REDIS_CLUSTER
+            )
         return cls._async_redis
 
     @classmethod
@@ -10,6 +10,7 @@ from mypy_boto3_s3.client import S3Client as BotoS3Client
 from mypy_boto3_s3.type_defs import FileobjTypeDef
 
 from app.core.config import settings
+from app.core.metrics import S3_OPERATION_DURATION
 
 logger = structlog.get_logger()
 
@@ -57,11 +58,12 @@ class S3Service:
             if content_type:
                 extra_args["ContentType"] = content_type
 
-            async with aiofiles.open(file_path, "rb") as file:
-                file_obj = cast(FileobjTypeDef, file)
-                await s3.upload_fileobj(  # type: ignore[misc]
-                    file_obj, settings.S3_BUCKET_NAME, object_name, ExtraArgs=extra_args
-                )
+            with S3_OPERATION_DURATION.labels("upload").time():
+                async with aiofiles.open(file_path, "rb") as file:
+                    file_obj = cast(FileobjTypeDef, file)
+                    await s3.upload_fileobj(  # type: ignore[misc]
+                        file_obj, settings.S3_BUCKET_NAME, object_name, ExtraArgs=extra_args
+                    )
 
             logger.info("file_uploaded", object_name=object_name)
             return object_name
@@ -70,9 +72,10 @@ class S3Service:
     async def download_file(cls, object_name: str, file_path: str) -> None:
         """Download a file from S3 bucket"""
         async with await cls.get_s3_client() as s3:  # type: ignore[misc]
-            async with aiofiles.open(file_path, "wb") as file:
-                file_obj = cast(FileobjTypeDef, file)
-                await s3.download_fileobj(settings.S3_BUCKET_NAME, object_name, file_obj)  # type: ignore[misc]
+            with S3_OPERATION_DURATION.labels("download").time():
+                async with aiofiles.open(file_path, "wb") as file:
+                    file_obj = cast(FileobjTypeDef, file)
+                    await s3.download_fileobj(settings.S3_BUCKET_NAME, object_name, file_obj)  # type: ignore[misc]
             logger.info("file_downloaded", object_name=object_name)
 
     @classmethod
@@ -91,7 +94,8 @@ class S3Service:
     async def delete_file(cls, object_name: str) -> None:
         """Delete a file from S3 bucket"""
         async with await cls.get_s3_client() as s3:  # type: ignore[misc]
-            await s3.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=object_name)  # type: ignore[misc]
+            with S3_OPERATION_DURATION.labels("delete").time():
+                await s3.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=object_name)  # type: ignore[misc]
             logger.info("file_deleted", object_name=object_name)
 
 
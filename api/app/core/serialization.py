@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+# orjson writes UTC offsets as "+00:00" where Pydantic writes "Z"; responses and
+# frames encoded by either must look the same to clients
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(value: Any, option: int = 0) -> bytes:
+    """Encode JSON with orjson, writing datetimes the way Pydantic does."""
+    return orjson.dumps(value, option=ORJSON_OPTIONS | option)
+
+
+def isoformat(value: datetime) -> str:
+    """An ISO 8601 datetime as Pydantic and `dumps` write it."""
+    text = value.isoformat()
+    if value.utcoffset() == timedelta(0):
+        return text.removesuffix("+00:00") + "Z"
+    return text
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """FastAPI's ORJSONResponse, with datetimes written the way Pydantic does."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
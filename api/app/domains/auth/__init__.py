@@ -1,5 +1,25 @@
 # Auth domain
 
-from app.domains.auth.models import Contact, Invitation, Message, Room, RoomMember, User
+from app.domains.auth.models import (
+    Attachment,
+    AttachmentUpload,
+    Contact,
+    Invitation,
+    Message,
+    Reaction,
+    Room,
+    RoomMember,
+    User,
+)
 
-__all__ = ["Contact", "Invitation", "Message", "Room", "RoomMember", "User"]
+__all__ = [
+    "Attachment",
+    "AttachmentUpload",
+    "Contact",
+    "Invitation",
+    "Message",
+    "Reaction",
+    "Room",
+    "RoomMember",
+    "User",
+]
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AttachmentResponse(BaseModel):
+    class Config:
+        from_attributes = True
+
+    id: int
+    content_hash: str
+    object_name: str
+    content_type: str
+    size: int
+    created_at: datetime
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import tempfile
+import uuid
+from collections.abc import AsyncIterator
+from datetime import timedelta
+from pathlib import Path
+
+import aiofiles
+from fastapi import HTTPException, status
+from structlog import get_logger
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.file_cache import file_cache
+from app.core.s3 import s3_service
+from app.domains.auth.models import Attachment, AttachmentUpload, User
+from app.domains.auth.repository import ChatRepository
+
+logger = get_logger()
+
+
+class AttachmentService:
+    @staticmethod
+    async def get_by_hash(content_hash: str) -> Attachment | None:
+        """Find an already stored attachment by its SHA-256 content hash."""
+        return await Attachment.filter(content_hash=content_hash.lower()).first()
+
+    @staticmethod
+    async def store_upload(
+        chunks: AsyncIterator[bytes], content_type: str, uploader: User
+    ) -> tuple[Attachment, bool]:
+        """Store an uploaded stream, hashing it on the fly.
+
+        Returns the attachment and whether it was newly created. Content that is
+        already known is not uploaded to S3 again, but the uploader is recorded so
+        they may send it, and its unsent expiry restarts.
+        """
+        tmp_path = Path(tempfile.gettempdir()) / f"upload-{uuid.uuid4().hex}"
+        hasher = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(tmp_path, "wb") as file:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > settings.MAX_UPLOAD_BYTES:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Attachment is too large",
+                        )
+                    hasher.update(chunk)
+                    await file.write(chunk)
+
+            if size == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="Attachment is empty"
+                )
+
+            content_hash = hasher.hexdigest()
+            existing = await AttachmentService.get_by_hash(content_hash)
+            if existing and await AttachmentService._record_upload(existing, uploader):
+                logger.info("attachment_deduplicated", attachment_id=existing.id, size=size)
+                return existing, False
+
+            object_name = f"attachments/{content_hash}"
+            await s3_service.upload_file(str(tmp_path), object_name, content_type)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        try:
+            async with in_transaction() as conn:
+                attachment = await Attachment.create(
+                    content_hash=content_hash,
+                    object_name=object_name,
+                    content_type=content_type,
+                    size=size,
+                    uploaded_by=uploader,
+                    using_db=conn,
+                )
+                await AttachmentUpload.create(attachment=attachment, user=uploader, using_db=conn)
+        except IntegrityError:
+            # Same content uploaded concurrently; both wrote the same S3 object
+            attachment = await Attachment.get(content_hash=content_hash)
+            await AttachmentService._record_upload(attachment, uploader)
+            return attachment, False
+
+        logger.info("attachment_stored", attachment_id=attachment.id, size=size)
+        return attachment, True
+
+    @staticmethod
+    async def _record_upload(attachment: Attachment, uploader: User) -> bool:
+        """Record a repeat upload of an attachment's content.
+
+        Returns False if the attachment was deleted in the meantime, in which case
+        the content has to be stored again.
+        """
+        touched = await Attachment.filter(id=attachment.id).update(updated_at=timezone.now())
+        if not touched:
+            return False
+        try:
+            await AttachmentUpload.get_or_create(attachment=attachment, user=uploader)
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    async def release(attachment_id: int, count: int = 1) -> None:
+        """Drop references to an attachment, deleting it with the last one.
+
+        Content someone uploaded but has not sent yet is kept; if they never send it,
+        `delete_unsent` removes it later.
+        """
+        async with in_transaction() as conn:
+            attachment = (
+                await Attachment.filter(id=attachment_id).select_for_update().using_db(conn).first()
+            )
+            if attachment is None:
+                return
+
+            attachment.ref_count = max(attachment.ref_count - count, 0)
+            pending = (
+                await AttachmentUpload.filter(attachment_id=attachment_id).using_db(conn).exists()
+            )
+            if attachment.ref_count > 0 or pending:
+                await attachment.save(using_db=conn, update_fields=["ref_count"])
+                return
+
+            await attachment.delete(using_db=conn)
+
+        await s3_service.delete_file(attachment.object_name)
+        file_cache.invalidate(attachment.object_name)
+        logger.info("attachment_deleted", attachment_id=attachment_id)
+
+    @staticmethod
+    async def delete_unsent() -> int:
+        """Delete attachments uploaded but never sent within UNSENT_ATTACHMENT_TTL_S.
+
+        Returns how many were deleted.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.UNSENT_ATTACHMENT_TTL_S)
+        rows = await ChatRepository.delete_unsent_attachments(cutoff)
+        for row in rows:
+            await s3_service.delete_file(row["object_name"])
+            file_cache.invalidate(row["object_name"])
+            logger.info("attachment_expired", attachment_id=row["id"])
+        return len(rows)
+
+    @staticmethod
+    async def run_cleanup() -> None:
+        """Delete unsent attachments every ATTACHMENT_CLEANUP_INTERVAL_S, until cancelled."""
+        while True:
+            try:
+                await AttachmentService.delete_unsent()
+            except Exception as e:
+                logger.error("attachment_cleanup_failed", error=str(e))
+            await asyncio.sleep(settings.ATTACHMENT_CLEANUP_INTERVAL_S)
+
+
+attachment_service = AttachmentService()
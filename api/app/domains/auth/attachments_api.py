@@ -0,0 +1,63 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from structlog import get_logger
+
+from app.domains.auth.attachment_schemas import AttachmentResponse
+from app.domains.auth.attachment_service import attachment_service
+from app.domains.auth.dependencies import get_current_active_user
+from app.domains.auth.models import Attachment, User
+from app.domains.auth.repository import ChatRepository
+
+logger = get_logger()
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+RAW_BODY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
+
+
+@router.post(
+    "",
+    response_model=AttachmentResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=RAW_BODY_OPENAPI,
+)
+async def upload_attachment(
+    request: Request,
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> Attachment:
+    """Upload an attachment as the raw request body.
+
+    Returns 200 instead of 201 when identical content is already stored.
+    """
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    attachment, created = await attachment_service.store_upload(
+        request.stream(), content_type, current_user
+    )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return attachment
+
+
+@router.get("/{content_hash}", response_model=AttachmentResponse)
+async def get_attachment_by_hash(
+    content_hash: Annotated[str, Path(pattern=r"^[0-9a-fA-F]{64}$")],
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> dict:
+    """Look up an attachment by SHA-256, so clients can skip uploading known content.
+
+    Only attachments the user uploaded or can see in one of their rooms are found;
+    other content has to be uploaded, which proves the client has it.
+    """
+    attachment = await ChatRepository.get_visible_attachment_by_hash(
+        content_hash.lower(), current_user.id
+    )
+    if not attachment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    return dict(attachment)
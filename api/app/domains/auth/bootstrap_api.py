@@ -0,0 +1,33 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+
+from app.core.etag import etag_for, etag_matches
+from app.core.serialization import ORJSONResponse
+from app.domains.auth.bootstrap_schemas import BootstrapResponse
+from app.domains.auth.bootstrap_service import bootstrap_service
+from app.domains.auth.dependencies import get_current_active_user
+from app.domains.auth.models import User
+
+router = APIRouter(prefix="/bootstrap", tags=["bootstrap"])
+
+
+@router.get("", response_model=BootstrapResponse)
+async def get_bootstrap(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    active_room_id: int | None = Query(None, description="Room whose first page to include"),
+    limit: int = Query(50, ge=1, le=100),
+) -> Response:
+    """The user, contacts, room summaries and the active room's first page, for first paint."""
+    data = await bootstrap_service.get_session(current_user, active_room_id, limit)
+    # Encoded straight from the rows; response_model documents the shape only
+    response = ORJSONResponse(data)
+
+    # The ETag hashes the body, so a client that already has it skips the transfer
+    etag = etag_for(response.body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.domains.auth.message_schemas import MessageResponse
+from app.domains.auth.schemas import ContactListResponse, UserResponse
+
+
+class RoomSummary(BaseModel):
+    id: int
+    name: str | None
+    owner_id: int | None
+    is_system: bool
+    last_seq: int
+    # seq of the last message the current user has read
+    last_read_seq: int
+    unread_count: int
+    member_count: int
+    last_message: MessageResponse | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class ActiveRoomPage(BaseModel):
+    room_id: int
+    messages: list[MessageResponse]
+    has_more: bool
+
+
+class BootstrapResponse(BaseModel):
+    user: UserResponse
+    contacts: ContactListResponse
+    # Most recently active first
+    rooms: list[RoomSummary]
+    # The first history page of the requested room, or of the most recently active one
+    active_room: ActiveRoomPage | None
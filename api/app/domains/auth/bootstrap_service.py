@@ -0,0 +1,97 @@
+from app.domains.auth.models import User
+from app.domains.auth.repository import chat_repository, message_from_row, user_from_row
+
+
+class BootstrapService:
+    @staticmethod
+    async def get_session(user: User, active_room_id: int | None = None, limit: int = 50) -> dict:
+        """Everything a client renders on first paint, in the shape of BootstrapResponse.
+
+        Runs the same five queries however many rooms and contacts the user has.
+        """
+        summaries = await chat_repository.get_room_summaries(user.id)
+        last_messages = {
+            row["room_id"]: message_from_row(row)
+            for row in await chat_repository.get_last_messages(user.id)
+        }
+
+        rooms = [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "owner_id": row["owner_id"],
+                "is_system": row["is_system"],
+                "last_seq": row["last_seq"],
+                "last_read_seq": row["last_read_seq"],
+                "unread_count": row["unread_count"],
+                "member_count": row["member_count"],
+                "last_message": last_messages.get(row["id"]),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+            }
+            for row in summaries
+        ]
+        # Rooms without messages rank by when they were created
+        rooms.sort(
+            key=lambda room: (
+                room["last_message"]["created_at"] if room["last_message"] else room["created_at"],
+                room["id"],
+            ),
+            reverse=True,
+        )
+
+        contacts = [
+            {
+                "id": row["id"],
+                "other_user": user_from_row(row, "other"),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+            }
+            for row in await chat_repository.get_contacts(user.id)
+        ]
+        sent, received = [], []
+        for row in await chat_repository.get_invitations(user.id):
+            invitation = {
+                "id": row["id"],
+                "from_user": user_from_row(row, "from_user"),
+                "to_user": user_from_row(row, "to_user"),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+            }
+            (sent if row["from_user_id"] == user.id else received).append(invitation)
+
+        # A room the user is not a member of falls back to the most recent one
+        room_ids = {room["id"] for room in rooms}
+        if active_room_id not in room_ids:
+            active_room_id = rooms[0]["id"] if rooms else None
+
+        active_room = None
+        if active_room_id is not None:
+            # Newest first, one extra to know whether there are more
+            rows = await chat_repository.get_history_page(active_room_id, limit + 1)
+            page = [message_from_row(row) for row in reversed(rows[:limit])]
+            active_room = {
+                "room_id": active_room_id,
+                "messages": page,
+                "has_more": len(rows) > limit,
+            }
+
+        return {
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "is_active": user.is_active,
+                "created_at": user.created_at,
+                "updated_at": user.updated_at,
+            },
+            "contacts": {
+                "sent_invitations": sent,
+                "received_invitations": received,
+                "contacts": contacts,
+            },
+            "rooms": rooms,
+            "active_room": active_room,
+        }
+
+
+bootstrap_service = BootstrapService()
@@ -3,7 +3,9 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.core.config import settings
 from app.domains.auth.models import User
+from app.domains.auth.repository import chat_repository
 from app.domains.auth.service import auth_service
 
 security = HTTPBearer()
@@ -22,7 +24,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = security_
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = await User.filter(username=token_data.username).first()
+    user = await chat_repository.get_user_by_username(token_data.username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -49,6 +51,17 @@ async def get_current_active_user(current_user: User = get_current_user_dependen
 get_current_active_user_dependency = Depends(get_current_active_user)
 
 
+async def get_current_admin_user(current_user: User = get_current_active_user_dependency) -> User:
+    """Get the current user, who must be listed in ADMIN_USERNAMES."""
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
+
+
 # Type aliases for cleaner usage
 CurrentUser = Annotated[User, Depends(get_current_user)]
 CurrentActiveUser = Annotated[User, Depends(get_current_active_user)]
+CurrentAdminUser = Annotated[User, Depends(get_current_admin_user)]
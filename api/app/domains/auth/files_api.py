@@ -0,0 +1,50 @@
+from typing import Annotated
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from structlog import get_logger
+
+from app.core.etag import etag_matches
+from app.core.file_cache import file_cache
+from app.domains.auth.dependencies import get_current_active_user
+from app.domains.auth.models import User
+from app.domains.auth.repository import chat_repository
+
+logger = get_logger()
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+S3_NOT_FOUND_CODES = {"404", "NoSuchKey"}
+
+
+@router.get("/{object_name:path}")
+async def get_file(
+    object_name: str,
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> Response:
+    """Serve a stored object through the local disk cache (supports Range and ETag).
+
+    Only attachments the user uploaded or that are attached to a message in one of the
+    user's rooms are served; anything else is reported as not found.
+    """
+    attachment = await chat_repository.get_visible_attachment(object_name, current_user.id)
+    if attachment is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    try:
+        cached = await file_cache.get(object_name)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in S3_NOT_FOUND_CODES:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+            ) from e
+        raise
+
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # The type recorded at upload, never one derived from the requested name
+    return FileResponse(cached.path, headers=headers, media_type=attachment["content_type"])
@@ -1,17 +1,24 @@
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
+from app.domains.auth.attachment_schemas import AttachmentResponse
 from app.domains.auth.schemas import UserResponse
 
 
-class MessageResponse(BaseModel):
+class MessageBase(BaseModel):
     id: int
     room_id: int
-    sender: UserResponse
+    seq: int
     content: str
+    attachment: AttachmentResponse | None = None
+    reaction_counts: dict[str, int] = Field(default_factory=dict)
     edited_at: datetime | None
+    deleted_at: datetime | None = None
+    version: int = 0
+    # The sender's client_msg_id, if it sent one
+    client_msg_id: str | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -19,11 +26,54 @@ class MessageResponse(BaseModel):
         from_attributes = True
 
 
+class MessageResponse(MessageBase):
+    sender: UserResponse
+
+
+class CompactMessageResponse(MessageBase):
+    """A message that refers to its sender by id; the sender is sent alongside once."""
+
+    sender_id: int
+
+
 class MessageHistoryResponse(BaseModel):
     messages: list[MessageResponse]
     has_more: bool
 
 
+class CompactMessageHistoryResponse(BaseModel):
+    messages: list[CompactMessageResponse]
+    # Every sender on the page, by id
+    users: dict[int, UserResponse]
+    has_more: bool
+
+
+class MessageEdit(BaseModel):
+    content: str = Field(..., min_length=1)
+
+
+class MessageChange(BaseModel):
+    """Compact description of an edited or deleted message."""
+
+    class Config:
+        from_attributes = True
+
+    id: int
+    room_id: int
+    seq: int
+    version: int
+    content: str
+    edited_at: datetime | None
+    deleted_at: datetime | None
+
+
+class MessageChangesResponse(BaseModel):
+    changes: list[MessageChange]
+    # Pass back as since_version on the next sync
+    version: int
+    has_more: bool
+
+
 # WebSocket message schemas
 class WSMessageBase(BaseModel):
     type: str
@@ -32,6 +82,16 @@ class WSMessageBase(BaseModel):
 class WSAuthMessage(WSMessageBase):
     type: Literal["auth"]
     token: str
+    # Receive messages with sender_id, and each sender once in a "users" frame
+    compact: bool = False
+    # Receive frames queued within a few milliseconds together, as one array frame
+    batch: bool = False
+    # Subscribe to every room the user is a member of, answered with a "subscribed" frame
+    subscribe_all: bool = False
+    # Track message frames until acked and redeliver unacked ones on reconnect
+    ack: bool = False
+    # Last message id seen per room; messages missed since arrive in one "catch_up" frame
+    last_seen: dict[int, int] = Field(default_factory=dict, max_length=1000)
 
 
 class WSSubscribeMessage(WSMessageBase):
@@ -39,6 +99,11 @@ class WSSubscribeMessage(WSMessageBase):
     room_id: int
 
 
+class WSSubscribeManyMessage(WSMessageBase):
+    type: Literal["subscribe_many"]
+    room_ids: list[int] = Field(..., max_length=1000)
+
+
 class WSUnsubscribeMessage(WSMessageBase):
     type: Literal["unsubscribe"]
     room_id: int
@@ -48,13 +113,81 @@ class WSSendMessage(WSMessageBase):
     type: Literal["send_message"]
     room_id: int
     content: str
+    attachment_id: int | None = None
+    # Retries with the same id return the original message instead of sending it again
+    client_msg_id: str | None = Field(None, max_length=64)
+
+
+class WSAckMessage(WSMessageBase):
+    """Message frames the client has processed, by message id."""
+
+    type: Literal["ack"]
+    message_ids: list[int] = Field(..., max_length=1000)
 
 
 class WSMessageReceived(WSMessageBase):
     type: Literal["message"]
+    room_id: int
+    # Per-room sequence number of the message, for client-side gap detection
+    seq: int
     message: MessageResponse
 
 
+class WSCompactMessageReceived(WSMessageBase):
+    type: Literal["message"]
+    room_id: int
+    seq: int
+    message: CompactMessageResponse
+
+
+class WSUsersMessage(WSMessageBase):
+    """Senders a compact connection has not seen yet, sent before their first message."""
+
+    type: Literal["users"]
+    users: dict[int, UserResponse]
+
+
+class WSCatchUpRoom(BaseModel):
+    room_id: int
+    # Oldest first
+    messages: list[MessageResponse] | list[CompactMessageResponse]
+    # More were missed than fit; fetch the rest with the range endpoint
+    has_more: bool
+
+
+class WSCatchUpMessage(WSMessageBase):
+    """Messages missed in the rooms of the auth frame's last_seen, sent before live ones.
+
+    Rooms without missed messages, or that the user is not a member of, are left out.
+    """
+
+    type: Literal["catch_up"]
+    rooms: list[WSCatchUpRoom]
+    # Senders of the messages, for compact connections
+    users: dict[int, UserResponse] | None = None
+
+
+class WSReactionsMessage(WSMessageBase):
+    type: Literal["reactions"]
+    room_id: int
+    message_id: int
+    # Net change per emoji since the previous reactions frame for this message
+    deltas: dict[str, int]
+
+
+class WSMessageChanged(WSMessageBase):
+    type: Literal["message_edited", "message_deleted"]
+    room_id: int
+    change: MessageChange
+
+
+class WSSubscribedMessage(WSMessageBase):
+    type: Literal["subscribed"]
+    room_ids: list[int]
+    # Requested rooms the user is not a member of
+    rejected_room_ids: list[int] = Field(default_factory=list)
+
+
 class WSErrorMessage(WSMessageBase):
     type: Literal["error"]
     error: str
@@ -62,4 +195,19 @@ class WSErrorMessage(WSMessageBase):
 
 class WSSuccessMessage(WSMessageBase):
     type: Literal["success"]
-    message: str 
\ No newline at end of file
+    message: str
+
+
+# Every frame a client may send, told apart by its type field
+WSClientMessage = Annotated[
+    WSAuthMessage
+    | WSSubscribeMessage
+    | WSSubscribeManyMessage
+    | WSUnsubscribeMessage
+    | WSSendMessage
+    | WSAckMessage,
+    Field(discriminator="type"),
+]
+
+# Built once: validating a frame is a single call into the compiled validator
+ws_client_message_adapter: TypeAdapter[WSClientMessage] = TypeAdapter(WSClientMessage)
@@ -1,69 +1,244 @@
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import Any
+
 from fastapi import HTTPException, status
 from structlog import get_logger
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
 
-from app.domains.auth.models import Message, Room, RoomMember, User
+from app.core.config import settings
+from app.domains.auth.attachment_service import attachment_service
+from app.domains.auth.models import Message, Reaction, Room, RoomMember, User
+from app.domains.auth.repository import chat_repository
 
 logger = get_logger()
 
+# Read with execute_query_dict: execute_query discards the RETURNING rows of UPDATEs
+NEXT_ROOM_VERSION_SQL = (
+    "UPDATE rooms SET change_version = change_version + 1 WHERE id = $1 RETURNING change_version"
+)
+
+
+class RecentSends:
+    """Rows of messages recently sent with a client_msg_id, by (sender_id, client_msg_id).
+
+    Least recently used first; entries expire after CLIENT_MSG_ID_WINDOW_S.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple[int, str], tuple[float, Any]] = OrderedDict()
+
+    def get(self, sender_id: int, client_msg_id: str) -> Any | None:
+        key = (sender_id, client_msg_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, row = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return row
+
+    def put(self, sender_id: int, client_msg_id: str, row: Any) -> None:
+        key = (sender_id, client_msg_id)
+        self._entries[key] = (time.monotonic() + settings.CLIENT_MSG_ID_WINDOW_S, row)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.CLIENT_MSG_ID_WINDOW_SIZE:
+            self._entries.popitem(last=False)
+
+
+recent_sends = RecentSends()
+
 
 class MessageService:
     @staticmethod
-    async def save_message(room_id: int, sender: User, content: str) -> Message:
-        """Save a message to the database."""
-        # Check if user is a member of the room
-        is_member = await RoomMember.filter(room_id=room_id, user=sender).exists()
-        if not is_member:
+    async def _check_member(room_id: int, user: User, using_db=None) -> None:
+        if not await chat_repository.is_member(room_id, user.id, using_db=using_db):
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this room"
+                status_code=status.HTTP_403_FORBIDDEN, detail="You are not a member of this room"
             )
-        
-        # Create the message
-        message = await Message.create(
+
+    @staticmethod
+    async def save_message(
+        room_id: int,
+        sender: User,
+        content: str,
+        attachment_id: int | None = None,
+        client_msg_id: str | None = None,
+    ) -> tuple[Any, bool]:
+        """Save a message and return it as a row joined with its sender and attachment.
+
+        Also returns whether it was inserted: a retry with a client_msg_id the sender
+        already used returns the original message instead.
+        """
+        if client_msg_id is not None:
+            row = recent_sends.get(sender.id, client_msg_id)
+            if row is not None:
+                return row, False
+
+        try:
+            row = await chat_repository.insert_message(
+                room_id, sender.id, content, attachment_id, client_msg_id
+            )
+        except IntegrityError:
+            # A concurrent retry inserted it first
+            if client_msg_id is None:
+                raise
+            row = None
+
+        if row is None:
+            # Nothing was written; find out why only on this slow path
+            if client_msg_id is not None:
+                row = await chat_repository.get_message_by_client_id(sender.id, client_msg_id)
+                if row is not None:
+                    recent_sends.put(sender.id, client_msg_id, row)
+                    return row, False
+            await MessageService._check_member(room_id, sender)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found"
+            )
+
+        logger.info(
+            "message_saved",
+            message_id=row["id"],
             room_id=room_id,
-            sender=sender,
-            content=content
+            seq=row["seq"],
+            sender_id=sender.id,
         )
-        
-        logger.info("message_saved", message_id=message.id, room_id=room_id, sender_id=sender.id)
-        return message
-    
+        if client_msg_id is not None:
+            recent_sends.put(sender.id, client_msg_id, row)
+        return row, True
+
     @staticmethod
     async def get_room_messages(
         room_id: int, 
         user: User, 
         limit: int = 50, 
         before_id: int | None = None
-    ) -> tuple[list[Message], bool]:
-        """Get messages for a room with pagination."""
-        # Check if user is a member of the room
-        is_member = await RoomMember.filter(room_id=room_id, user=user).exists()
-        if not is_member:
+    ) -> tuple[list, bool]:
+        """Get message rows for a room with pagination, oldest first."""
+        await MessageService._check_member(room_id, user)
+
+        # Newest first, one extra to know whether there are more
+        rows = await chat_repository.get_history_page(room_id, limit + 1, before_id)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+
+        return rows, has_more
+
+    @staticmethod
+    async def get_room_messages_by_seq(
+        room_id: int, user: User, from_seq: int, to_seq: int | None = None, limit: int = 100
+    ) -> tuple[list, bool]:
+        """Get message rows of a room in an inclusive sequence range, oldest first."""
+        await MessageService._check_member(room_id, user)
+
+        rows = await chat_repository.get_seq_range(room_id, from_seq, to_seq, limit + 1)
+
+        has_more = len(rows) > limit
+        return rows[:limit], has_more
+
+    @staticmethod
+    async def _lock_own_message(message_id: int, user: User, conn) -> Message:
+        """Lock a message for update, checking that the user may change it."""
+        message = (
+            await Message.filter(id=message_id, deleted_at__isnull=True)
+            .select_for_update()
+            .using_db(conn)
+            .first()
+        )
+        if not message:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+
+        if message.sender_id != user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this room"
+                detail="You can only change your own messages",
+            )
+
+        await MessageService._check_member(message.room_id, user, using_db=conn)
+        return message
+
+    @staticmethod
+    async def edit_message(message_id: int, user: User, content: str) -> Message:
+        """Edit a message and bump the room's change version."""
+        async with in_transaction() as conn:
+            message = await MessageService._lock_own_message(message_id, user, conn)
+            rows = await conn.execute_query_dict(NEXT_ROOM_VERSION_SQL, [message.room_id])
+
+            message.content = content
+            message.edited_at = datetime.now(UTC)
+            message.version = rows[0]["change_version"]
+            await message.save(using_db=conn, update_fields=["content", "edited_at", "version"])
+
+        logger.info("message_edited", message_id=message.id, version=message.version)
+        return message
+
+    @staticmethod
+    async def delete_message(message_id: int, user: User) -> Message:
+        """Soft-delete a message, leaving a tombstone, and bump the room's change version."""
+        async with in_transaction() as conn:
+            message = await MessageService._lock_own_message(message_id, user, conn)
+            rows = await conn.execute_query_dict(NEXT_ROOM_VERSION_SQL, [message.room_id])
+
+            attachment_id = message.attachment_id
+            message.content = ""
+            message.attachment_id = None
+            message.reaction_counts = {}
+            message.deleted_at = datetime.now(UTC)
+            message.version = rows[0]["change_version"]
+            await message.save(
+                using_db=conn,
+                update_fields=[
+                    "content",
+                    "attachment_id",
+                    "reaction_counts",
+                    "deleted_at",
+                    "version",
+                ],
+            )
+            await Reaction.filter(message_id=message.id).using_db(conn).delete()
+
+        if attachment_id is not None:
+            await attachment_service.release(attachment_id)
+
+        logger.info("message_deleted", message_id=message.id, version=message.version)
+        return message
+
+    @staticmethod
+    async def get_room_changes(
+        room_id: int, user: User, since_version: int, limit: int = 100
+    ) -> tuple[list[Message], int, bool]:
+        """Get messages edited or deleted after a room change version.
+
+        Returns the changes (oldest first), the version to resume from and whether
+        more changes are pending.
+        """
+        await MessageService._check_member(room_id, user)
+
+        current_version = (
+            await Room.filter(id=room_id).first().values_list("change_version", flat=True)
+        )
+        messages = (
+            await Message.filter(
+                room_id=room_id, version__gt=since_version, version__lte=current_version
             )
-        
-        # Build query
-        query = Message.filter(room_id=room_id)
-        
-        # Add pagination
-        if before_id:
-            query = query.filter(id__lt=before_id)
-        
-        # Get messages ordered by newest first
-        messages = await query.order_by("-id").limit(limit + 1).prefetch_related("sender")
-        
-        # Check if there are more messages
+            .order_by("version")
+            .limit(limit + 1)
+        )
+
         has_more = len(messages) > limit
         if has_more:
             messages = messages[:limit]
-        
-        # Reverse to get chronological order
-        messages.reverse()
-        
-        return messages, has_more
-    
+            current_version = messages[-1].version
+
+        return messages, current_version, has_more
+
     @staticmethod
     async def get_user_rooms(user: User) -> list[int]:
         """Get all room IDs where the user is a member."""
@@ -71,4 +246,4 @@ class MessageService:
         return list(room_ids)
 
 
-message_service = MessageService() 
\ No newline at end of file
+message_service = MessageService() 
@@ -1,139 +1,301 @@
-import asyncio
-from typing import Optional
+import time
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, Depends, Path, Query, WebSocket, WebSocketDisconnect, status
 from structlog import get_logger
 
+from app.core.query_stats import report_query_stats, track_queries
+from app.core.serialization import ORJSONResponse
 from app.domains.auth.dependencies import get_current_active_user
-from app.domains.auth.message_schemas import MessageHistoryResponse, MessageResponse
+from app.domains.auth.message_schemas import (
+    CompactMessageHistoryResponse,
+    MessageChange,
+    MessageChangesResponse,
+    MessageEdit,
+    MessageHistoryResponse,
+    WSAuthMessage,
+    WSMessageChanged,
+)
 from app.domains.auth.message_service import message_service
 from app.domains.auth.models import User
+from app.domains.auth.reaction_service import reaction_service
+from app.domains.auth.repository import (
+    chat_repository,
+    compact_message_from_row,
+    message_from_row,
+    user_from_row,
+)
 from app.domains.auth.service import auth_service
-from app.domains.auth.websocket_manager import manager
+from app.domains.auth.websocket_manager import (
+    MSGPACK_SUBPROTOCOL,
+    WS_SUBPROTOCOLS,
+    describe_frame_error,
+    encode_frame,
+    manager,
+    parse_client_frame,
+)
 
 logger = get_logger()
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 
-@router.get("/rooms/{room_id}/history", response_model=MessageHistoryResponse)
+async def _broadcast_change(event_type: str, change: MessageChange) -> None:
+    event = WSMessageChanged(type=event_type, room_id=change.room_id, change=change)
+    await manager.broadcast_to_room(change.room_id, event.model_dump(mode="json"))
+
+
+def _history_response(rows: list, has_more: bool, compact: bool = False) -> ORJSONResponse:
+    # Encoded straight from the rows; response_model documents the shape only
+    if not compact:
+        return ORJSONResponse(
+            {"messages": [message_from_row(row) for row in rows], "has_more": has_more}
+        )
+
+    users = {}
+    for row in rows:
+        if row["sender_id"] not in users:
+            users[row["sender_id"]] = user_from_row(row)
+    return ORJSONResponse(
+        {
+            "messages": [compact_message_from_row(row) for row in rows],
+            "users": users,
+            "has_more": has_more,
+        }
+    )
+
+
+@router.get(
+    "/rooms/{room_id}/history",
+    response_model=MessageHistoryResponse | CompactMessageHistoryResponse,
+)
 async def get_message_history(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Annotated[User, Depends(get_current_active_user)],
     limit: int = Query(50, ge=1, le=100),
-    before_id: Optional[int] = Query(None),
-) -> MessageHistoryResponse:
+    before_id: int | None = Query(None),
+    compact: bool = Query(False, description="Refer to senders by id and list them once"),
+) -> ORJSONResponse:
     """Get message history for a room."""
-    messages, has_more = await message_service.get_room_messages(
+    rows, has_more = await message_service.get_room_messages(
         room_id=room_id,
         user=current_user,
         limit=limit,
         before_id=before_id
     )
-    
-    # Build response
-    message_responses = []
-    for message in messages:
-        message_responses.append(
-            MessageResponse(
-                id=message.id,
-                room_id=message.room_id,
-                sender=message.sender,
-                content=message.content,
-                edited_at=message.edited_at,
-                created_at=message.created_at,
-                updated_at=message.updated_at,
-            )
-        )
-    
-    return MessageHistoryResponse(messages=message_responses, has_more=has_more)
+    return _history_response(rows, has_more, compact)
+
+
+@router.get(
+    "/rooms/{room_id}/range",
+    response_model=MessageHistoryResponse | CompactMessageHistoryResponse,
+)
+async def get_message_range(  # noqa: PLR0913, PLR0917
+    room_id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    from_seq: int = Query(..., ge=1),
+    to_seq: int | None = Query(None, ge=1),
+    limit: int = Query(100, ge=1, le=100),
+    compact: bool = Query(False, description="Refer to senders by id and list them once"),
+) -> ORJSONResponse:
+    """Get messages of a room by per-room sequence number (inclusive), to fill gaps."""
+    rows, has_more = await message_service.get_room_messages_by_seq(
+        room_id=room_id, user=current_user, from_seq=from_seq, to_seq=to_seq, limit=limit
+    )
+    return _history_response(rows, has_more, compact)
+
+
+@router.get("/rooms/{room_id}/changes", response_model=MessageChangesResponse)
+async def get_message_changes(
+    room_id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    since_version: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+) -> MessageChangesResponse:
+    """Get messages edited or deleted since a room change version."""
+    messages, version, has_more = await message_service.get_room_changes(
+        room_id=room_id, user=current_user, since_version=since_version, limit=limit
+    )
+    return MessageChangesResponse(
+        changes=[MessageChange.model_validate(message) for message in messages],
+        version=version,
+        has_more=has_more,
+    )
+
+
+@router.patch("/{message_id}", response_model=MessageChange)
+async def edit_message(
+    message_id: int,
+    message_data: MessageEdit,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> MessageChange:
+    """Edit one of your messages."""
+    message = await message_service.edit_message(message_id, current_user, message_data.content)
+    change = MessageChange.model_validate(message)
+    await _broadcast_change("message_edited", change)
+    return change
+
+
+@router.delete("/{message_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_message(
+    message_id: int, current_user: Annotated[User, Depends(get_current_active_user)]
+) -> None:
+    """Delete one of your messages. A tombstone keeps its place in the room sequence."""
+    message = await message_service.delete_message(message_id, current_user)
+    await _broadcast_change("message_deleted", MessageChange.model_validate(message))
+
+
+@router.put("/{message_id}/reactions/{emoji}", status_code=status.HTTP_204_NO_CONTENT)
+async def add_reaction(
+    message_id: int,
+    emoji: Annotated[str, Path(min_length=1, max_length=32)],
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> None:
+    """React to a message. Reacting twice with the same emoji is a no-op."""
+    room_id, changed = await reaction_service.add_reaction(message_id, current_user, emoji)
+    if changed:
+        manager.queue_reaction_delta(room_id, message_id, emoji, 1)
+
+
+@router.delete("/{message_id}/reactions/{emoji}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_reaction(
+    message_id: int,
+    emoji: Annotated[str, Path(min_length=1, max_length=32)],
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> None:
+    """Remove your reaction from a message."""
+    room_id, changed = await reaction_service.remove_reaction(message_id, current_user, emoji)
+    if changed:
+        manager.queue_reaction_delta(room_id, message_id, emoji, -1)
+
+
+async def _receive_frame(websocket: WebSocket, binary: bool) -> str | bytes:
+    if binary:
+        return await websocket.receive_bytes()
+    return await websocket.receive_text()
+
+
+async def _reject(websocket: WebSocket, binary: bool, error: str) -> None:
+    """Send an error before the connection is registered, then close."""
+    frame = encode_frame({"type": "error", "error": error}, binary)
+    if binary:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+    await websocket.close()
+
+
+async def _authenticate(websocket: WebSocket, binary: bool) -> tuple[User, WSAuthMessage] | None:
+    """Read the auth frame and look up its user; rejects and closes on failure."""
+    # Wait for authentication message
+    try:
+        auth = parse_client_frame(await _receive_frame(websocket, binary))
+    except ValueError:
+        auth = None
+    logger.info("websocket_auth_received", type=getattr(auth, "type", None))
+
+    if not isinstance(auth, WSAuthMessage):
+        await _reject(websocket, binary, "First message must be auth")
+        return None
+
+    # Verify token
+    if not auth.token:
+        await _reject(websocket, binary, "No token provided")
+        return None
+
+    try:
+        token_data = auth_service.verify_token(auth.token)
+        logger.info("token_verified", username=token_data.username if token_data else None)
+    except Exception as e:
+        logger.error("token_verification_failed", error=str(e))
+        await _reject(websocket, binary, "Invalid token")
+        return None
+
+    if not token_data:
+        await _reject(websocket, binary, "Invalid token")
+        return None
+
+    # Get user
+    user = await chat_repository.get_user_by_username(token_data.username)
+    logger.info("user_lookup", username=token_data.username, found=user is not None)
+
+    if not user or not user.is_active:
+        await _reject(websocket, binary, "User not found or inactive")
+        return None
+
+    return user, auth
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time messaging."""
+    """WebSocket endpoint for real-time messaging.
+
+    Frames are JSON text by default. Clients may offer the `chat.msgpack` subprotocol
+    to exchange MessagePack binary frames instead, or `chat.json` to name the default.
+    """
     user = None
     user_id = None
     
     try:
-        await websocket.accept()
-        logger.info("websocket_accepted")
-        
-        # Wait for authentication message
-        auth_data = await websocket.receive_json()
-        logger.info("websocket_auth_received", data=auth_data)
-        
-        if auth_data.get("type") != "auth":
-            await websocket.send_json({"type": "error", "error": "First message must be auth"})
-            await websocket.close()
-            return
-        
-        # Verify token
-        token = auth_data.get("token")
-        if not token:
-            await websocket.send_json({"type": "error", "error": "No token provided"})
-            await websocket.close()
-            return
-        
-        try:
-            token_data = auth_service.verify_token(token)
-            logger.info("token_verified", username=token_data.username if token_data else None)
-        except Exception as e:
-            logger.error("token_verification_failed", error=str(e))
-            await websocket.send_json({"type": "error", "error": "Invalid token"})
-            await websocket.close()
-            return
-            
-        if not token_data:
-            await websocket.send_json({"type": "error", "error": "Invalid token"})
-            await websocket.close()
-            return
-        
-        # Get user
-        user = await User.filter(username=token_data.username).first()
-        logger.info("user_lookup", username=token_data.username, found=user is not None)
-        
-        if not user or not user.is_active:
-            await websocket.send_json({"type": "error", "error": "User not found or inactive"})
-            await websocket.close()
+        offered = websocket.scope.get("subprotocols", [])
+        subprotocol = next((p for p in WS_SUBPROTOCOLS if p in offered), None)
+        binary = subprotocol == MSGPACK_SUBPROTOCOL
+        await websocket.accept(subprotocol=subprotocol)
+        logger.info("websocket_accepted", subprotocol=subprotocol)
+
+        authenticated = await _authenticate(websocket, binary)
+        if authenticated is None:
             return
-        
+        user, auth = authenticated
         user_id = user.id
         
         # Connect user
-        await manager.connect(websocket, user_id)
-        await websocket.send_json({"type": "success", "message": "Authenticated successfully"})
+        await manager.connect(
+            websocket, user_id, compact=auth.compact, binary=binary, batch=auth.batch, ack=auth.ack
+        )
+        await manager.send_to_user(
+            user_id, {"type": "success", "message": "Authenticated successfully"}
+        )
         logger.info("websocket_authenticated", user_id=user_id)
-        
+        if auth.ack and not auth.last_seen:
+            await manager.redeliver_pending(user_id)
+        if auth.last_seen:
+            # Live frames wait until the catch-up frame is out
+            manager.hold_frames(user_id)
+        if auth.subscribe_all:
+            await manager.subscribe_to_member_rooms(user_id, user)
+        if auth.last_seen:
+            # Followed by unacked frames the catch-up frame does not cover
+            await manager.send_catch_up(user_id, auth.last_seen, redeliver=auth.ack)
+
         # Handle messages
         while True:
-            data = await websocket.receive_json()
-            await manager.handle_message(user_id, user, data)
-    
+            data = await _receive_frame(websocket, binary)
+            try:
+                msg = parse_client_frame(data)
+            except ValueError as e:
+                await manager.send_to_user(
+                    user_id, {"type": "error", "error": describe_frame_error(e)}
+                )
+                continue
+
+            started = time.perf_counter()
+            with track_queries() as stats:
+                await manager.handle_message(user_id, user, msg)
+            report_query_stats(stats, "ws", msg.type, time.perf_counter() - started)
+
     except WebSocketDisconnect:
         logger.info("websocket_disconnected", user_id=user_id)
         if user_id:
-            await manager.disconnect(user_id)
+            await manager.disconnect(user_id, websocket)
     except Exception as e:
         logger.error("websocket_error", error=str(e), user_id=user_id, error_type=type(e).__name__)
         if user_id:
-            await manager.disconnect(user_id)
+            await manager.disconnect(user_id, websocket)
 
 
-# Background task to handle Redis pub/sub
-async def redis_listener():
-    """Listen to Redis pub/sub and forward messages to WebSocket clients."""
+# Background task to handle the message bus
+async def bus_listener():
+    """Listen to the message bus and forward room events to WebSocket clients."""
     await manager.initialize()
-    
-    # Subscribe to a dummy channel to initialize pubsub
-    await manager.pubsub.subscribe("dummy_channel")
-    
-    while True:
-        try:
-            # Get message from Redis
-            message = await manager.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if message and message["type"] == "message" and message["channel"] != b"dummy_channel":
-                await manager.handle_redis_message(message)
-        except Exception as e:
-            logger.error("redis_listener_error", error=str(e))
-            await asyncio.sleep(1)  # Wait before retrying 
\ No newline at end of file
+    await manager.bus.listen(manager.handle_event)
@@ -47,6 +47,10 @@ class Room(BaseModel):
     name = fields.CharField(max_length=255, null=True)
     owner = fields.ForeignKeyField("models.User", related_name="owned_rooms", null=True)
     is_system = fields.BooleanField(default=False)
+    # Sequence number of the latest message; bumped atomically on every insert
+    last_seq = fields.IntField(default=0)
+    # Bumped on every edit/delete of a message in the room, for incremental sync
+    change_version = fields.BigIntField(default=0)
 
     def __str__(self):
         return f"Room({self.id}, system={self.is_system})"
@@ -60,19 +64,83 @@ class RoomMember(BaseModel):
     room = fields.ForeignKeyField("models.Room", related_name="members")
     user = fields.ForeignKeyField("models.User", related_name="room_memberships")
     joined_at = fields.DatetimeField(auto_now_add=True)
+    # seq of the last message the member has read; unread count is last_seq minus this.
+    # Members added to a room start at its last_seq when they join
+    last_read_seq = fields.IntField(default=0)
 
     def __str__(self):
         return f"{self.user} in {self.room}"
 
 
+class Attachment(BaseModel):
+    class Meta:
+        table = "attachments"
+
+    # Content-addressed: identical uploads share one row and one S3 object
+    content_hash = fields.CharField(max_length=64, unique=True)
+    object_name = fields.CharField(max_length=255, unique=True)
+    content_type = fields.CharField(max_length=255)
+    size = fields.BigIntField()
+    # Number of messages referencing this attachment
+    ref_count = fields.IntField(default=0)
+    uploaded_by = fields.ForeignKeyField(
+        "models.User", related_name="attachments", null=True, on_delete=fields.SET_NULL
+    )
+
+    def __str__(self):
+        return f"Attachment({self.id}, {self.content_hash})"
+
+
+class AttachmentUpload(BaseModel):
+    """A user who uploaded an attachment's content but has not sent it in a message yet."""
+
+    class Meta:
+        table = "attachment_uploads"
+        unique_together = (("attachment", "user"),)
+
+    attachment = fields.ForeignKeyField("models.Attachment", related_name="uploads")
+    user = fields.ForeignKeyField("models.User", related_name="attachment_uploads")
+
+    def __str__(self):
+        return f"{self.user} uploaded {self.attachment}"
+
+
 class Message(BaseModel):
     class Meta:
         table = "messages"
+        unique_together = (("room", "seq"),)
 
     room = fields.ForeignKeyField("models.Room", related_name="messages")
+    # Dense per-room sequence number (1, 2, 3, ...) for ordering and gap detection
+    seq = fields.IntField()
     sender = fields.ForeignKeyField("models.User", related_name="sent_messages")
     content = fields.TextField()
     edited_at = fields.DatetimeField(null=True)
+    # Soft-deleted messages stay as tombstones so seq stays dense
+    deleted_at = fields.DatetimeField(null=True)
+    # Room change_version at the last edit/delete (0 if never changed)
+    version = fields.BigIntField(default=0)
+    attachment = fields.ForeignKeyField(
+        "models.Attachment", related_name="messages", null=True, on_delete=fields.RESTRICT
+    )
+    # Pre-aggregated {emoji: count}, kept in sync with the reactions table
+    reaction_counts = fields.JSONField(default=dict)
+    # Chosen by the client to make retried sends idempotent; unique per sender through a
+    # partial index (see migration 20240110_01)
+    client_msg_id = fields.CharField(max_length=64, null=True)
 
     def __str__(self):
         return f"Message({self.id}, room={self.room_id}, sender={self.sender_id})"
+
+
+class Reaction(BaseModel):
+    class Meta:
+        table = "reactions"
+        unique_together = (("message", "user", "emoji"),)
+
+    message = fields.ForeignKeyField("models.Message", related_name="reactions")
+    user = fields.ForeignKeyField("models.User", related_name="reactions")
+    emoji = fields.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.user} reacted {self.emoji} to {self.message}"
@@ -0,0 +1,86 @@
+from fastapi import HTTPException, status
+from structlog import get_logger
+from tortoise import connections
+
+from app.domains.auth.models import Message, RoomMember, User
+
+logger = get_logger()
+
+# Insert the reaction and bump the message counter in one statement; a duplicate
+# reaction inserts nothing and therefore updates nothing.
+ADD_REACTION_SQL = """
+WITH inserted AS (
+    INSERT INTO reactions (message_id, user_id, emoji, created_at, updated_at)
+    VALUES ($1, $2, $3, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (message_id, user_id, emoji) DO NOTHING
+    RETURNING message_id
+)
+UPDATE messages
+SET reaction_counts = jsonb_set(
+    reaction_counts, ARRAY[$3::text], to_jsonb(COALESCE((reaction_counts ->> $3)::int, 0) + 1)
+)
+WHERE id IN (SELECT message_id FROM inserted)
+RETURNING id
+"""
+
+REMOVE_REACTION_SQL = """
+WITH deleted AS (
+    DELETE FROM reactions
+    WHERE message_id = $1 AND user_id = $2 AND emoji = $3
+    RETURNING message_id
+)
+UPDATE messages
+SET reaction_counts = CASE
+    WHEN COALESCE((reaction_counts ->> $3)::int, 0) <= 1 THEN reaction_counts - $3::text
+    ELSE jsonb_set(
+        reaction_counts, ARRAY[$3::text], to_jsonb((reaction_counts ->> $3)::int - 1)
+    )
+END
+WHERE id IN (SELECT message_id FROM deleted)
+RETURNING id
+"""
+
+
+class ReactionService:
+    @staticmethod
+    async def _get_message_for_member(message_id: int, user: User) -> Message:
+        # Deleted messages keep their tombstone but take no reactions
+        message = (
+            await Message.filter(id=message_id, deleted_at__isnull=True)
+            .only("id", "room_id")
+            .first()
+        )
+        if not message:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+
+        is_member = await RoomMember.filter(room_id=message.room_id, user=user).exists()
+        if not is_member:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="You are not a member of this room"
+            )
+        return message
+
+    @staticmethod
+    async def add_reaction(message_id: int, user: User, emoji: str) -> tuple[int, bool]:
+        """Add a reaction. Returns the message's room id and whether anything changed."""
+        message = await ReactionService._get_message_for_member(message_id, user)
+        conn = connections.get("default")
+        updated, _ = await conn.execute_query(ADD_REACTION_SQL, [message_id, user.id, emoji])
+
+        if updated:
+            logger.info("reaction_added", message_id=message_id, user_id=user.id, emoji=emoji)
+        return message.room_id, bool(updated)
+
+    @staticmethod
+    async def remove_reaction(message_id: int, user: User, emoji: str) -> tuple[int, bool]:
+        """Remove a reaction. Returns the message's room id and whether anything changed."""
+        message = await ReactionService._get_message_for_member(message_id, user)
+        conn = connections.get("default")
+        updated, _ = await conn.execute_query(REMOVE_REACTION_SQL, [message_id, user.id, emoji])
+
+        if updated:
+            logger.info("reaction_removed", message_id=message_id, user_id=user.id, emoji=emoji)
+        return message.room_id, bool(updated)
+
+
+reaction_service = ReactionService()
@@ -0,0 +1,390 @@
+import json
+from datetime import datetime
+from typing import Any
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.domains.auth.models import User
+
+# Hand-written SQL for the hottest queries. These skip Tortoise query building and model
+# construction and return plain rows. Each statement is a fixed string with positional
+# parameters, so asyncpg prepares it once per connection and reuses it from its cache.
+
+# Message columns joined with the sender and the attachment, in the shape of MessageResponse
+MESSAGE_SELECT = """
+SELECT m.id, m.room_id, m.seq, m.content, m.reaction_counts, m.edited_at, m.deleted_at,
+       m.version, m.client_msg_id, m.created_at, m.updated_at,
+       u.id AS sender_id, u.username AS sender_username, u.is_active AS sender_is_active,
+       u.created_at AS sender_created_at, u.updated_at AS sender_updated_at,
+       a.id AS attachment_id, a.content_hash AS attachment_content_hash,
+       a.object_name AS attachment_object_name, a.content_type AS attachment_content_type,
+       a.size AS attachment_size, a.created_at AS attachment_created_at
+FROM {source} m
+JOIN users u ON u.id = m.sender_id
+LEFT JOIN attachments a ON a.id = m.attachment_id
+"""
+
+IS_MEMBER_SQL = "SELECT EXISTS (SELECT 1 FROM room_members WHERE room_id = $1 AND user_id = $2)"
+
+HISTORY_PAGE_SQL = MESSAGE_SELECT.format(source="messages") + (
+    "WHERE m.room_id = $1 ORDER BY m.id DESC LIMIT $2"
+)
+
+HISTORY_PAGE_BEFORE_SQL = MESSAGE_SELECT.format(source="messages") + (
+    "WHERE m.room_id = $1 AND m.id < $2 ORDER BY m.id DESC LIMIT $3"
+)
+
+MESSAGE_BY_CLIENT_ID_SQL = MESSAGE_SELECT.format(source="messages") + (
+    "WHERE m.sender_id = $1 AND m.client_msg_id = $2"
+)
+
+SEQ_RANGE_SQL = MESSAGE_SELECT.format(source="messages") + (
+    "WHERE m.room_id = $1 AND m.seq >= $2 AND m.seq <= $3 ORDER BY m.seq LIMIT $4"
+)
+
+# Whether user {user} may see attachment {attachment}: they uploaded its content and have
+# not sent it yet, or it is attached to a message in one of their rooms
+ATTACHMENT_VISIBLE = """(
+    EXISTS (
+        SELECT 1 FROM attachment_uploads up
+        WHERE up.attachment_id = {attachment}.id AND up.user_id = {user}
+    ) OR EXISTS (
+        SELECT 1 FROM messages vm
+        JOIN room_members vrm ON vrm.room_id = vm.room_id AND vrm.user_id = {user}
+        WHERE vm.attachment_id = {attachment}.id
+    )
+)"""
+
+VISIBLE_ATTACHMENT_SELECT = """
+SELECT a.id, a.content_hash, a.object_name, a.content_type, a.size, a.created_at
+FROM attachments a
+WHERE a.{column} = $1 AND """ + ATTACHMENT_VISIBLE.format(attachment="a", user="$2")
+
+VISIBLE_ATTACHMENT_BY_NAME_SQL = VISIBLE_ATTACHMENT_SELECT.format(column="object_name")
+
+VISIBLE_ATTACHMENT_BY_HASH_SQL = VISIBLE_ATTACHMENT_SELECT.format(column="content_hash")
+
+# Unreferenced attachments last uploaded before $1 and not attached to any message; a
+# concurrent send's ref_count increment makes the row fail the check when re-evaluated
+DELETE_UNSENT_SQL = """
+DELETE FROM attachments a
+WHERE a.ref_count = 0 AND a.updated_at < $1
+  AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.attachment_id = a.id)
+RETURNING a.id, a.object_name
+"""
+
+# Sends a message in one round trip: checks membership, takes a reference on the
+# attachment, takes the room's next seq and inserts, returning the message joined with
+# its sender and attachment. Returns no row when the sender is not a member, the
+# attachment does not exist or is not visible to the sender, or the sender already sent
+# a message with the same client_msg_id ($5); a concurrent duplicate fails on the unique
+# index. The row lock taken by the rooms UPDATE serializes inserts per room until commit,
+# which keeps sequence numbers dense and in insert order. Sending also marks the room
+# read up to the new message for the sender, and consumes their pending upload of the
+# attachment.
+INSERT_MESSAGE_SQL = (
+    """
+WITH member AS (
+    SELECT 1 FROM room_members WHERE room_id = $1 AND user_id = $2
+      AND NOT EXISTS (SELECT 1 FROM messages WHERE sender_id = $2 AND client_msg_id = $5)
+), attachment AS (
+    UPDATE attachments SET ref_count = ref_count + 1
+    WHERE id = $4 AND EXISTS (SELECT 1 FROM member)
+      AND """
+    + ATTACHMENT_VISIBLE.format(attachment="attachments", user="$2")
+    + """
+    RETURNING id
+), next AS (
+    UPDATE rooms SET last_seq = last_seq + 1
+    WHERE id = $1
+      AND EXISTS (SELECT 1 FROM member)
+      AND ($4::int IS NULL OR EXISTS (SELECT 1 FROM attachment))
+    RETURNING id, last_seq
+), m AS (
+    INSERT INTO messages (room_id, seq, sender_id, content, attachment_id, reaction_counts,
+                          version, client_msg_id, created_at, updated_at)
+    SELECT next.id, next.last_seq, $2, $3, $4, '{}'::jsonb, 0, $5, CURRENT_TIMESTAMP,
+           CURRENT_TIMESTAMP
+    FROM next
+    RETURNING *
+), read AS (
+    UPDATE room_members SET last_read_seq = next.last_seq
+    FROM next
+    WHERE room_members.room_id = $1 AND room_members.user_id = $2
+), sent AS (
+    DELETE FROM attachment_uploads
+    WHERE attachment_id = $4 AND user_id = $2 AND EXISTS (SELECT 1 FROM next)
+)
+"""
+    + MESSAGE_SELECT.format(source="m")
+)
+
+# Messages after the last seen one in each listed room the user is a member of, up to
+# $4 per room, by room then seq. $2 and $3 are parallel arrays of room ids and last seen
+# message ids; the last seen message's seq bounds a scan of uq_messages_room_id_seq.
+MISSED_MESSAGES_SQL = (
+    """
+WITH m AS (
+    SELECT missed.*
+    FROM unnest($2::int[], $3::int[]) AS seen(room_id, last_id)
+    JOIN room_members rm ON rm.room_id = seen.room_id AND rm.user_id = $1
+    CROSS JOIN LATERAL (
+        SELECT * FROM messages
+        WHERE room_id = seen.room_id
+          AND seq > COALESCE(
+              (SELECT seq FROM messages WHERE id = seen.last_id AND room_id = seen.room_id), 0
+          )
+        ORDER BY seq
+        LIMIT $4
+    ) missed
+)
+"""
+    + MESSAGE_SELECT.format(source="m")
+    + "ORDER BY m.room_id, m.seq"
+)
+
+# Moves a member's read position forward, never past the room's latest message
+MARK_READ_SQL = """
+UPDATE room_members rm
+SET last_read_seq = GREATEST(rm.last_read_seq, LEAST($3, r.last_seq))
+FROM rooms r
+WHERE r.id = rm.room_id AND rm.room_id = $1 AND rm.user_id = $2
+RETURNING rm.last_read_seq, GREATEST(r.last_seq - rm.last_read_seq, 0) AS unread_count
+"""
+
+# The user's rooms with their member count and the user's unread count
+ROOM_SUMMARIES_SQL = """
+SELECT r.id, r.name, r.owner_id, r.is_system, r.last_seq, r.created_at, r.updated_at,
+       rm.last_read_seq, GREATEST(r.last_seq - rm.last_read_seq, 0) AS unread_count,
+       (SELECT COUNT(*) FROM room_members c WHERE c.room_id = r.id) AS member_count
+FROM room_members rm
+JOIN rooms r ON r.id = rm.room_id
+WHERE rm.user_id = $1
+"""
+
+# The latest message of each of the user's rooms
+LAST_MESSAGES_SQL = """
+WITH m AS (
+    SELECT msg.*
+    FROM room_members rm
+    JOIN rooms r ON r.id = rm.room_id
+    JOIN messages msg ON msg.room_id = r.id AND msg.seq = r.last_seq
+    WHERE rm.user_id = $1
+)
+""" + MESSAGE_SELECT.format(source="m")
+
+USER_COLUMNS = """
+       {alias}.id AS {alias}_id, {alias}.username AS {alias}_username,
+       {alias}.is_active AS {alias}_is_active, {alias}.created_at AS {alias}_created_at,
+       {alias}.updated_at AS {alias}_updated_at"""
+
+# The user's contacts, each with the other user
+CONTACTS_SQL = (
+    "SELECT c.id, c.created_at, c.updated_at,"
+    + USER_COLUMNS.format(alias="other")
+    + """
+FROM contacts c
+JOIN users other ON other.id = CASE WHEN c.user1_id = $1 THEN c.user2_id ELSE c.user1_id END
+WHERE c.user1_id = $1 OR c.user2_id = $1
+ORDER BY c.id
+"""
+)
+
+# Invitations the user sent or received, with both users
+INVITATIONS_SQL = (
+    "SELECT i.id, i.created_at, i.updated_at,"
+    + USER_COLUMNS.format(alias="from_user")
+    + ","
+    + USER_COLUMNS.format(alias="to_user")
+    + """
+FROM invitations i
+JOIN users from_user ON from_user.id = i.from_user_id
+JOIN users to_user ON to_user.id = i.to_user_id
+WHERE i.from_user_id = $1 OR i.to_user_id = $1
+ORDER BY i.id
+"""
+)
+
+# Upper bound for an open-ended seq range; seq is a 32-bit column
+MAX_SEQ = 2**31 - 1
+
+
+def user_from_row(row: Any, prefix: str = "sender") -> dict:
+    """The `prefix`_ user columns of a joined row, by default the sender's, as UserResponse."""
+    return {
+        "id": row[f"{prefix}_id"],
+        "username": row[f"{prefix}_username"],
+        "is_active": row[f"{prefix}_is_active"],
+        "created_at": row[f"{prefix}_created_at"],
+        "updated_at": row[f"{prefix}_updated_at"],
+    }
+
+
+def _message_from_row(row: Any, sender_key: str, sender: Any) -> dict:
+    reaction_counts = row["reaction_counts"]
+    if isinstance(reaction_counts, str):
+        reaction_counts = json.loads(reaction_counts)
+
+    attachment = None
+    if row["attachment_id"] is not None:
+        attachment = {
+            "id": row["attachment_id"],
+            "content_hash": row["attachment_content_hash"],
+            "object_name": row["attachment_object_name"],
+            "content_type": row["attachment_content_type"],
+            "size": row["attachment_size"],
+            "created_at": row["attachment_created_at"],
+        }
+
+    return {
+        "id": row["id"],
+        "room_id": row["room_id"],
+        "seq": row["seq"],
+        sender_key: sender,
+        "content": row["content"],
+        "attachment": attachment,
+        "reaction_counts": reaction_counts,
+        "edited_at": row["edited_at"],
+        "deleted_at": row["deleted_at"],
+        "version": row["version"],
+        "client_msg_id": row["client_msg_id"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def message_from_row(row: Any) -> dict:
+    """Nest a joined message row into the shape of MessageResponse."""
+    return _message_from_row(row, "sender", user_from_row(row))
+
+
+def compact_message_from_row(row: Any) -> dict:
+    """A joined message row in the shape of CompactMessageResponse, without the sender."""
+    return _message_from_row(row, "sender_id", row["sender_id"])
+
+
+class ChatRepository:
+    @staticmethod
+    def _conn(using_db: BaseDBAsyncClient | None) -> BaseDBAsyncClient:
+        return using_db or connections.get("default")
+
+    @staticmethod
+    async def is_member(
+        room_id: int, user_id: int, using_db: BaseDBAsyncClient | None = None
+    ) -> bool:
+        """Whether the user is a member of the room."""
+        _, rows = await ChatRepository._conn(using_db).execute_query(
+            IS_MEMBER_SQL, [room_id, user_id]
+        )
+        return bool(rows[0][0])
+
+    @staticmethod
+    async def get_user_by_username(username: str) -> User | None:
+        """Look up a user by username.
+
+        Through the ORM, as callers need a `User` they can save; a single-row lookup
+        by a unique column.
+        """
+        return await User.filter(username=username).first()
+
+    @staticmethod
+    async def get_history_page(room_id: int, limit: int, before_id: int | None = None) -> list:
+        """Up to `limit` messages of a room, newest first, optionally older than `before_id`."""
+        conn = ChatRepository._conn(None)
+        if before_id is None:
+            _, rows = await conn.execute_query(HISTORY_PAGE_SQL, [room_id, limit])
+        else:
+            _, rows = await conn.execute_query(HISTORY_PAGE_BEFORE_SQL, [room_id, before_id, limit])
+        return rows
+
+    @staticmethod
+    async def get_seq_range(room_id: int, from_seq: int, to_seq: int | None, limit: int) -> list:
+        """Up to `limit` messages of a room in an inclusive seq range, oldest first."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            SEQ_RANGE_SQL, [room_id, from_seq, MAX_SEQ if to_seq is None else to_seq, limit]
+        )
+        return rows
+
+    @staticmethod
+    async def get_missed_messages(user_id: int, last_seen: dict[int, int], limit: int) -> list:
+        """Up to `limit` messages per room after the last seen message id, for member rooms."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            MISSED_MESSAGES_SQL, [user_id, list(last_seen), list(last_seen.values()), limit]
+        )
+        return rows
+
+    @staticmethod
+    async def get_visible_attachment(object_name: str, user_id: int) -> Any | None:
+        """The attachment stored as `object_name`, or None if the user may not see it."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            VISIBLE_ATTACHMENT_BY_NAME_SQL, [object_name, user_id]
+        )
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def get_visible_attachment_by_hash(content_hash: str, user_id: int) -> Any | None:
+        """The attachment with a content hash, or None if the user may not see it."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            VISIBLE_ATTACHMENT_BY_HASH_SQL, [content_hash, user_id]
+        )
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def delete_unsent_attachments(cutoff: datetime) -> list[dict]:
+        """Delete attachments never sent and idle since before `cutoff`; returns their rows."""
+        return await ChatRepository._conn(None).execute_query_dict(DELETE_UNSENT_SQL, [cutoff])
+
+    @staticmethod
+    async def mark_read(room_id: int, user_id: int, seq: int) -> dict | None:
+        """Move the member's read position up to `seq`; None if not a member."""
+        # execute_query discards the RETURNING rows of UPDATEs
+        rows = await ChatRepository._conn(None).execute_query_dict(
+            MARK_READ_SQL, [room_id, user_id, seq]
+        )
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def get_room_summaries(user_id: int) -> list:
+        _, rows = await ChatRepository._conn(None).execute_query(ROOM_SUMMARIES_SQL, [user_id])
+        return rows
+
+    @staticmethod
+    async def get_last_messages(user_id: int) -> list:
+        _, rows = await ChatRepository._conn(None).execute_query(LAST_MESSAGES_SQL, [user_id])
+        return rows
+
+    @staticmethod
+    async def get_contacts(user_id: int) -> list:
+        _, rows = await ChatRepository._conn(None).execute_query(CONTACTS_SQL, [user_id])
+        return rows
+
+    @staticmethod
+    async def get_invitations(user_id: int) -> list:
+        _, rows = await ChatRepository._conn(None).execute_query(INVITATIONS_SQL, [user_id])
+        return rows
+
+    @staticmethod
+    async def get_message_by_client_id(sender_id: int, client_msg_id: str) -> Any | None:
+        """The message the sender sent with this client_msg_id, if any."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            MESSAGE_BY_CLIENT_ID_SQL, [sender_id, client_msg_id]
+        )
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def insert_message(
+        room_id: int,
+        sender_id: int,
+        content: str,
+        attachment_id: int | None,
+        client_msg_id: str | None = None,
+    ) -> Any | None:
+        """Insert a message if the sender is a member; see INSERT_MESSAGE_SQL."""
+        _, rows = await ChatRepository._conn(None).execute_query(
+            INSERT_MESSAGE_SQL, [room_id, sender_id, content, attachment_id, client_msg_id]
+        )
+        return rows[0] if rows else None
+
+
+chat_repository = ChatRepository()
@@ -32,6 +32,8 @@ class RoomResponse(BaseModel):
     name: str | None
     owner: UserResponse | None
     is_system: bool
+    # Sequence number of the room's latest message (0 if empty)
+    last_seq: int
     members: list[RoomMemberResponse]
     created_at: datetime
     updated_at: datetime
@@ -39,3 +41,13 @@ class RoomResponse(BaseModel):
 
 class RoomListResponse(BaseModel):
     rooms: list[RoomResponse]
+
+
+class RoomRead(BaseModel):
+    # Sequence number of the last message read; positions past the latest are clamped
+    seq: int = Field(..., ge=0)
+
+
+class RoomReadResponse(BaseModel):
+    last_read_seq: int
+    unread_count: int
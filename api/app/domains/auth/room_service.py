@@ -1,15 +1,21 @@
+from collections import Counter
+
 from fastapi import HTTPException, status
 from structlog import get_logger
 from tortoise.exceptions import IntegrityError
 
-from app.domains.auth.models import Room, RoomMember, User
+from app.domains.auth.attachment_service import attachment_service
+from app.domains.auth.models import Message, Room, RoomMember, User
+from app.domains.auth.repository import chat_repository
 
 logger = get_logger()
 
 
 class RoomService:
     @staticmethod
-    async def create_user_room(owner: User, name: str, member_usernames: list[str] | None = None) -> Room:
+    async def create_user_room(
+        owner: User, name: str, member_usernames: list[str] | None = None
+    ) -> Room:
         """Create a user-owned room."""
         # Create the room
         room = await Room.create(name=name, owner=owner, is_system=False)
@@ -85,9 +91,10 @@ class RoomService:
                 logger.warning("already_member", username=username, room_id=room.id)
                 continue
 
-            # Add to room
+            # Add to room, with the history before joining already read
+            last_seq = await Room.filter(id=room.id).first().values_list("last_seq", flat=True)
             try:
-                await RoomMember.create(room=room, user=user)
+                await RoomMember.create(room=room, user=user, last_read_seq=last_seq)
                 logger.info("member_added_to_room", room_id=room.id, user_id=user.id)
             except IntegrityError:
                 logger.warning("failed_to_add_member", username=username, room_id=room.id)
@@ -128,6 +135,16 @@ class RoomService:
 
         return list(rooms)
 
+    @staticmethod
+    async def mark_read(room_id: int, user: User, seq: int) -> dict:
+        """Move the user's read position in a room forward to `seq`."""
+        position = await chat_repository.mark_read(room_id, user.id, seq)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="You are not a member of this room"
+            )
+        return position
+
     @staticmethod
     async def leave_room(room_id: int, user: User) -> None:
         """Leave a user-owned room."""
@@ -171,6 +188,11 @@ class RoomService:
                 status_code=status.HTTP_403_FORBIDDEN, detail="Only room owner can delete the room"
             )
 
+        # Attachments referenced by the room's messages lose those references
+        attachment_ids = await Message.filter(
+            room=room, attachment_id__not_isnull=True
+        ).values_list("attachment_id", flat=True)
+
         # Delete all memberships first (due to foreign key)
         await RoomMember.filter(room=room).delete()
 
@@ -178,6 +200,9 @@ class RoomService:
         await room.delete()
         logger.info("room_deleted", room_id=room_id, owner_id=user.id)
 
+        for attachment_id, count in Counter(attachment_ids).items():
+            await attachment_service.release(attachment_id, count)
+
     @staticmethod
     async def get_or_create_system_room(user1: User, user2: User) -> Room:
         """Get existing system room for two users or create a new one."""
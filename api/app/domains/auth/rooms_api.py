@@ -10,6 +10,8 @@ from app.domains.auth.room_schemas import (
     RoomCreate,
     RoomListResponse,
     RoomMemberResponse,
+    RoomRead,
+    RoomReadResponse,
     RoomResponse,
 )
 from app.domains.auth.room_service import room_service
@@ -41,6 +43,7 @@ async def create_room(
         name=room.name,
         owner=room.owner,
         is_system=room.is_system,
+        last_seq=room.last_seq,
         members=members,
         created_at=room.created_at,
         updated_at=room.updated_at,
@@ -70,6 +73,7 @@ async def get_rooms(
                 name=room.name,
                 owner=room.owner,
                 is_system=room.is_system,
+                last_seq=room.last_seq,
                 members=members,
                 created_at=room.created_at,
                 updated_at=room.updated_at,
@@ -97,6 +101,7 @@ async def get_room(
         name=room.name,
         owner=room.owner,
         is_system=room.is_system,
+        last_seq=room.last_seq,
         members=members,
         created_at=room.created_at,
         updated_at=room.updated_at,
@@ -125,12 +130,24 @@ async def add_members(
         name=room.name,
         owner=room.owner,
         is_system=room.is_system,
+        last_seq=room.last_seq,
         members=members,
         created_at=room.created_at,
         updated_at=room.updated_at,
     )
 
 
+@router.post("/{room_id}/read", response_model=RoomReadResponse)
+async def mark_room_read(
+    room_id: int,
+    read_data: RoomRead,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> RoomReadResponse:
+    """Mark the room read up to a message sequence number; the read position never moves back."""
+    position = await room_service.mark_read(room_id, current_user, read_data.seq)
+    return RoomReadResponse(**position)
+
+
 @router.post("/{room_id}/leave", status_code=status.HTTP_204_NO_CONTENT)
 async def leave_room(
     room_id: int, current_user: Annotated[User, Depends(get_current_active_user)]
@@ -1,3 +1,6 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 
 from jose import JWTError, jwt
@@ -5,6 +8,7 @@ from passlib.context import CryptContext
 from structlog import get_logger
 
 from app.core.config import settings
+from app.core.metrics import BCRYPT_DURATION, BCRYPT_QUEUE_WAIT
 from app.domains.auth.models import User
 from app.domains.auth.schemas import TokenData
 
@@ -14,6 +18,25 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
 
+# bcrypt is deliberately slow; run it off the event loop on a bounded pool
+bcrypt_executor = ThreadPoolExecutor(
+    max_workers=settings.BCRYPT_POOL_SIZE, thread_name_prefix="bcrypt"
+)
+
+
+def _timed_bcrypt(func, submitted_at: float, *args):
+    BCRYPT_QUEUE_WAIT.observe(time.perf_counter() - submitted_at)
+    with BCRYPT_DURATION.time():
+        return func(*args)
+
+
+async def run_bcrypt(func, *args):
+    """Run a password hash or check on the bcrypt pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        bcrypt_executor, _timed_bcrypt, func, time.perf_counter(), *args
+    )
+
 
 class AuthService:
     @staticmethod
@@ -57,7 +80,7 @@ class AuthService:
         user = await User.filter(username=username).first()
         if not user:
             return None
-        if not AuthService.verify_password(password, user.hashed_password):
+        if not await run_bcrypt(AuthService.verify_password, password, user.hashed_password):
             return None
         if not user.is_active:
             return None
@@ -66,7 +89,7 @@ class AuthService:
     @staticmethod
     async def create_user(username: str, password: str) -> User:
         """Create a new user with hashed password."""
-        hashed_password = AuthService.get_password_hash(password)
+        hashed_password = await run_bcrypt(AuthService.get_password_hash, password)
         user = await User.create(username=username, hashed_password=hashed_password)
         return user
 
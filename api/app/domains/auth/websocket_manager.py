@@ -1,25 +1,130 @@
-import json
-from typing import Dict, Set
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Set
 
+import msgpack
+import orjson
 from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
 from structlog import get_logger
 
-from app.core.redis import redis_service
+from app.core.config import settings
+from app.core.message_bus import create_message_bus
+from app.core.metrics import (
+    PUBSUB_CHANNELS,
+    PUBSUB_DELIVERY_LATENCY,
+    PUBSUB_LISTENER_LAG,
+    WS_CONNECTIONS,
+    WS_PENDING_DROPPED,
+    WS_PENDING_FRAMES,
+    WS_REDELIVERED_FRAMES,
+    WS_SUBSCRIPTIONS,
+)
+from app.core.query_stats import create_untracked_task
+from app.core.serialization import dumps, isoformat
 from app.domains.auth.message_schemas import (
-    MessageResponse,
+    WSAckMessage,
     WSAuthMessage,
+    WSClientMessage,
     WSErrorMessage,
+    WSReactionsMessage,
     WSSendMessage,
+    WSSubscribedMessage,
+    WSSubscribeManyMessage,
     WSSubscribeMessage,
     WSSuccessMessage,
     WSUnsubscribeMessage,
+    ws_client_message_adapter,
 )
 from app.domains.auth.message_service import message_service
 from app.domains.auth.models import User
+from app.domains.auth.repository import (
+    chat_repository,
+    compact_message_from_row,
+    message_from_row,
+    user_from_row,
+)
 from app.domains.auth.service import auth_service
 
 logger = get_logger()
 
+JSON_SUBPROTOCOL = "chat.json"
+MSGPACK_SUBPROTOCOL = "chat.msgpack"
+# In order of preference when a client offers several
+WS_SUBPROTOCOLS = (MSGPACK_SUBPROTOCOL, JSON_SUBPROTOCOL)
+
+
+def _msgpack_default(value):
+    # Same representation as the JSON frames
+    if isinstance(value, datetime):
+        return isoformat(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_frame(frame: dict, binary: bool) -> str | bytes:
+    """Encode an outgoing frame as JSON text, or as MessagePack for binary connections."""
+    if binary:
+        return msgpack.packb(frame, default=_msgpack_default)
+    return dumps(frame).decode()
+
+
+def batch_frames(frames: list[str | bytes]) -> str | bytes:
+    """Join encoded frames of one connection into a single array frame, without re-encoding."""
+    if len(frames) == 1:
+        return frames[0]
+    if isinstance(frames[0], bytes):
+        return msgpack.Packer().pack_array_header(len(frames)) + b"".join(frames)
+    return "[" + ",".join(frames) + "]"
+
+
+def parse_client_frame(data: str | bytes) -> WSClientMessage:
+    """Validate a client frame, JSON text or MessagePack bytes, in one call.
+
+    Raises ValueError (including pydantic's ValidationError) for malformed frames.
+    """
+    if isinstance(data, bytes):
+        return ws_client_message_adapter.validate_python(msgpack.unpackb(data))
+    return ws_client_message_adapter.validate_json(data)
+
+
+def describe_frame_error(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        if first["type"] == "union_tag_invalid":
+            return f"Unknown message type: {first['ctx']['tag']}"
+        return f"Invalid message: {first['msg']}"
+    return "Invalid message: malformed frame"
+
+
+def encode_room_event(
+    room_id: int,
+    frame: dict,
+    exclude_user_id: int | None = None,
+    compact_frame: dict | None = None,
+    sender: dict | None = None,
+) -> bytes:
+    """Encode a frame for pub/sub: a JSON routing header, a newline, then the frame.
+
+    Message events also carry the compact frame and a "users" frame with the sender,
+    each on its own line, and the message id and seq in the header for ack tracking. Frames
+    are encoded once here and forwarded to every subscriber as-is.
+    """
+    header = {"room_id": room_id, "exclude_user_id": exclude_user_id, "published_at": time.time()}
+    lines = [dumps(frame)]
+    if compact_frame is not None and sender is not None:
+        header["sender_id"] = sender["id"]
+        header["message_id"] = frame["message"]["id"]
+        header["seq"] = frame["seq"]
+        lines.append(dumps(compact_frame))
+        lines.append(
+            dumps(
+                {"type": "users", "users": {sender["id"]: sender}}, option=orjson.OPT_NON_STR_KEYS
+            )
+        )
+    return b"\n".join([dumps(header), *lines])
+
 
 class ConnectionManager:
     def __init__(self):
@@ -27,119 +132,476 @@ class ConnectionManager:
         self.active_connections: Dict[int, WebSocket] = {}
         # Room subscriptions by user_id
         self.user_subscriptions: Dict[int, Set[int]] = {}
-        # Redis pubsub for cross-server communication
-        self.redis_client = None
-        self.pubsub = None
-    
+        # Local subscribers by room_id; a room's channel is subscribed while it has any
+        self.room_subscribers: dict[int, set[int]] = {}
+        # Senders already sent to each compact-format connection, by user_id
+        self.compact_known_senders: dict[int, set[int]] = {}
+        # Connections that negotiated the MessagePack subprotocol
+        self.msgpack_connections: set[int] = set()
+        # Frames waiting to go out together, for connections that opted into batching
+        self.batch_outboxes: dict[int, list[str | bytes]] = {}
+        self._batch_flush_tasks: dict[int, asyncio.Task] = {}
+        # Unacknowledged message events by user_id then message_id, for connections that
+        # opted into acks: the event's frame, compact frame, users frame, sender_id,
+        # room_id and seq
+        self.pending_frames: dict[int, OrderedDict[int, tuple]] = {}
+        self._pending_expiry: dict[int, asyncio.TimerHandle] = {}
+        # Frames held back by user_id until the user's catch-up frame has been sent: an
+        # encoded frame with no key, or a message event keyed by (room_id, seq), which is
+        # delivered afterwards only if the catch-up frame did not contain the message
+        self.held_frames: dict[int, list[tuple[tuple[int, int] | None, Any]]] = {}
+        # Message bus for cross-server communication
+        self.bus = create_message_bus()
+        # Pending reaction deltas by message_id: (room_id, {emoji: delta})
+        self.reaction_deltas: dict[int, tuple[int, Counter[str]]] = {}
+        self._reaction_flush_task: asyncio.Task | None = None
+
     async def initialize(self):
-        """Initialize Redis pub/sub."""
-        self.redis_client = await redis_service.get_async_redis()
-        self.pubsub = self.redis_client.pubsub()
-    
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Connect a user's WebSocket."""
+        """Connect the message bus."""
+        await self.bus.connect()
+
+    async def connect(  # noqa: PLR0913, PLR0917
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        compact: bool = False,
+        binary: bool = False,
+        batch: bool = False,
+        ack: bool = False,
+    ):
+        """Connect a user's WebSocket.
+
+        With `ack`, frames still pending from the user's previous connection are kept
+        for `redeliver_pending`.
+        """
         # WebSocket should already be accepted by the endpoint handler
         self.active_connections[user_id] = websocket
+        # A new connection for the same user starts without the old one's subscriptions
+        previous = self.user_subscriptions.pop(user_id, None)
+        if previous:
+            await self.unsubscribe_from_rooms(user_id, list(previous))
         self.user_subscriptions[user_id] = set()
+        if compact:
+            self.compact_known_senders[user_id] = set()
+        else:
+            self.compact_known_senders.pop(user_id, None)
+        if binary:
+            self.msgpack_connections.add(user_id)
+        else:
+            self.msgpack_connections.discard(user_id)
+        if batch:
+            self.batch_outboxes[user_id] = []
+        else:
+            self.batch_outboxes.pop(user_id, None)
+        expiry = self._pending_expiry.pop(user_id, None)
+        if expiry is not None:
+            expiry.cancel()
+        if ack:
+            self.pending_frames.setdefault(user_id, OrderedDict())
+        else:
+            self._drop_pending(user_id, "no_ack")
         logger.info("websocket_connected", user_id=user_id)
     
-    async def disconnect(self, user_id: int):
-        """Disconnect a user's WebSocket."""
+    async def disconnect(self, user_id: int, websocket: WebSocket):
+        """Disconnect a user's WebSocket.
+
+        Does nothing if the user has connected again since: the state belongs to the
+        new connection.
+        """
+        if self.active_connections.get(user_id) is not websocket:
+            logger.info("websocket_replaced_connection_closed", user_id=user_id)
+            return
+
         # Unsubscribe from all rooms
-        if user_id in self.user_subscriptions:
-            for room_id in self.user_subscriptions[user_id]:
-                await self.unsubscribe_from_room(user_id, room_id)
-            del self.user_subscriptions[user_id]
-        
+        subscriptions = self.user_subscriptions.pop(user_id, None)
+        if subscriptions:
+            await self.unsubscribe_from_rooms(user_id, list(subscriptions))
+
         # Remove connection
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-        
+        del self.active_connections[user_id]
+        self.compact_known_senders.pop(user_id, None)
+        self.msgpack_connections.discard(user_id)
+        self.batch_outboxes.pop(user_id, None)
+        self.held_frames.pop(user_id, None)
+        flush_task = self._batch_flush_tasks.pop(user_id, None)
+        if flush_task is not None and flush_task is not asyncio.current_task():
+            flush_task.cancel()
+        # Keep unacknowledged frames for a while in case the user reconnects
+        if user_id in self.pending_frames and user_id not in self._pending_expiry:
+            self._pending_expiry[user_id] = asyncio.get_running_loop().call_later(
+                settings.WS_PENDING_TTL_S, self._expire_pending, user_id
+            )
+
         logger.info("websocket_disconnected", user_id=user_id)
-    
+
+    def _expire_pending(self, user_id: int):
+        self._pending_expiry.pop(user_id, None)
+        if user_id not in self.active_connections:
+            self._drop_pending(user_id, "expired")
+
+    def _drop_pending(self, user_id: int, reason: str):
+        pending = self.pending_frames.pop(user_id, None)
+        if pending:
+            WS_PENDING_DROPPED.labels(reason).inc(len(pending))
+
+    def _track_pending(self, pending: OrderedDict[int, tuple], message_id: int, event: tuple):
+        pending[message_id] = event
+        if len(pending) > settings.WS_PENDING_MAX_FRAMES:
+            pending.popitem(last=False)
+            WS_PENDING_DROPPED.labels("overflow").inc()
+
+    async def redeliver_pending(self, user_id: int, caught_up: set[tuple[int, int]] | None = None):
+        """Send the frames the user's previous connection did not acknowledge, oldest first.
+
+        They stay pending until acknowledged; clients drop messages they already have
+        by message id. Messages whose (room_id, seq) is in `caught_up` were just sent
+        in the catch-up frame and are skipped.
+        """
+        pending = self.pending_frames.get(user_id)
+        if not pending:
+            return
+        caught_up = caught_up or set()
+        packed: dict[str, bytes] = {}
+        redelivered = 0
+        for frame, compact_frame, users_frame, sender_id, room_id, seq in list(pending.values()):
+            if (room_id, seq) in caught_up:
+                continue
+            await self._deliver(user_id, frame, compact_frame, users_frame, sender_id, packed)
+            redelivered += 1
+        WS_REDELIVERED_FRAMES.inc(redelivered)
+        logger.info(
+            "websocket_frames_redelivered",
+            user_id=user_id,
+            frames=redelivered,
+            skipped=len(pending) - redelivered,
+        )
+
     async def subscribe_to_room(self, user_id: int, room_id: int):
         """Subscribe a user to a room."""
-        if user_id not in self.user_subscriptions:
-            self.user_subscriptions[user_id] = set()
-        
-        self.user_subscriptions[user_id].add(room_id)
-        
-        # Subscribe to Redis channel
-        channel_name = f"room:{room_id}"
-        await self.pubsub.subscribe(channel_name)
-        
-        logger.info("user_subscribed_to_room", user_id=user_id, room_id=room_id)
-    
+        await self.subscribe_to_rooms(user_id, [room_id])
+
+    async def subscribe_to_rooms(self, user_id: int, room_ids: list[int]):
+        """Subscribe a user to rooms.
+
+        Rooms no other local user is subscribed to are registered in one round trip.
+        """
+        subscriptions = self.user_subscriptions.setdefault(user_id, set())
+        new_rooms = []
+        for room_id in room_ids:
+            subscriptions.add(room_id)
+            subscribers = self.room_subscribers.setdefault(room_id, set())
+            if not subscribers:
+                new_rooms.append(room_id)
+            subscribers.add(user_id)
+
+        if new_rooms:
+            await self.bus.add_rooms(new_rooms)
+
+        logger.info(
+            "user_subscribed_to_rooms",
+            user_id=user_id,
+            rooms=len(room_ids),
+            new_rooms=len(new_rooms),
+        )
+
+    async def subscribe_to_member_rooms(self, user_id: int, user: User):
+        """Subscribe a user to every room they are a member of."""
+        room_ids = await message_service.get_user_rooms(user)
+        await self.subscribe_to_rooms(user_id, room_ids)
+        await self.send_to_user(
+            user_id, WSSubscribedMessage(type="subscribed", room_ids=room_ids).dict()
+        )
+
     async def unsubscribe_from_room(self, user_id: int, room_id: int):
         """Unsubscribe a user from a room."""
-        if user_id in self.user_subscriptions:
-            self.user_subscriptions[user_id].discard(room_id)
-        
-        # Check if any other users are subscribed
-        any_subscribed = any(
-            room_id in subs 
-            for uid, subs in self.user_subscriptions.items() 
-            if uid != user_id
-        )
-        
-        # Unsubscribe from Redis channel if no one else is subscribed
-        if not any_subscribed:
-            channel_name = f"room:{room_id}"
-            await self.pubsub.unsubscribe(channel_name)
-        
-        logger.info("user_unsubscribed_from_room", user_id=user_id, room_id=room_id)
-    
+        await self.unsubscribe_from_rooms(user_id, [room_id])
+
+    async def unsubscribe_from_rooms(self, user_id: int, room_ids: list[int]):
+        """Unsubscribe a user from rooms.
+
+        Rooms no other local user is subscribed to are unregistered in one round trip.
+        """
+        subscriptions = self.user_subscriptions.get(user_id, set())
+        stale_rooms = []
+        for room_id in room_ids:
+            subscriptions.discard(room_id)
+            subscribers = self.room_subscribers.get(room_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(user_id)
+            if not subscribers:
+                del self.room_subscribers[room_id]
+                stale_rooms.append(room_id)
+
+        if stale_rooms:
+            await self.bus.remove_rooms(stale_rooms)
+
+        logger.info("user_unsubscribed_from_rooms", user_id=user_id, rooms=len(room_ids))
+
     async def send_to_user(self, user_id: int, message: dict):
         """Send a message to a specific user."""
+        await self.send_frame_to_user(
+            user_id, encode_frame(message, user_id in self.msgpack_connections)
+        )
+
+    async def send_frame_to_user(self, user_id: int, data: str | bytes, batch: bool = True):
+        """Send an already encoded frame to a specific user.
+
+        For connections that opted into batching the frame is queued instead, unless
+        `batch` is false. While the user's frames are held, it waits for `send_catch_up`.
+        """
+        held = self.held_frames.get(user_id)
+        if held is not None:
+            held.append((None, data))
+            return
+
+        if batch and user_id in self.batch_outboxes:
+            await self._queue_for_batch(user_id, data)
+            return
+
+        await self._write(user_id, data)
+
+    async def _write(self, user_id: int, data: str | bytes):
         if user_id in self.active_connections:
             websocket = self.active_connections[user_id]
             try:
-                await websocket.send_json(message)
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
             except Exception as e:
                 logger.error("failed_to_send_to_user", user_id=user_id, error=str(e))
-                await self.disconnect(user_id)
-    
-    async def broadcast_to_room(self, room_id: int, message: dict, exclude_user_id: int = None):
-        """Broadcast a message to all users in a room."""
-        # Publish to Redis for cross-server communication
-        channel_name = f"room:{room_id}"
-        message_data = {
-            "room_id": room_id,
-            "message": message,
-            "exclude_user_id": exclude_user_id
-        }
-        await self.redis_client.publish(channel_name, json.dumps(message_data))
-    
-    async def handle_redis_message(self, message):
-        """Handle a message from Redis pub/sub."""
+                await self.disconnect(user_id, websocket)
+
+    def hold_frames(self, user_id: int):
+        """Hold back frames for the user until `send_catch_up` has sent the catch-up frame."""
+        self.held_frames.setdefault(user_id, [])
+
+    async def send_catch_up(
+        self, user_id: int, last_seen: dict[int, int], redeliver: bool = False
+    ):
+        """Send the messages missed since `last_seen` as one "catch_up" frame.
+
+        The messages of every room come from one query, at most WS_CATCH_UP_ROOM_LIMIT
+        per room. With `redeliver`, unacknowledged frames the catch-up frame did not
+        cover follow. Frames held back meanwhile come last, oldest first, minus the
+        messages the catch-up frame contained, before delivery resumes as usual.
+        """
+        # (room_id, seq) of every message in the catch-up frame
+        caught_up: set[tuple[int, int]] = set()
+        try:
+            limit = settings.WS_CATCH_UP_ROOM_LIMIT
+            rows = await chat_repository.get_missed_messages(user_id, last_seen, limit + 1)
+            frame = self._catch_up_frame(user_id, rows, limit)
+            await self._write(user_id, encode_frame(frame, user_id in self.msgpack_connections))
+            for room in frame["rooms"]:
+                caught_up.update((room["room_id"], message["seq"]) for message in room["messages"])
+            logger.info("websocket_caught_up", user_id=user_id, rooms=len(frame["rooms"]))
+        except Exception as e:
+            logger.error("failed_to_catch_up", user_id=user_id, error=str(e))
+            await self._write(
+                user_id,
+                encode_frame(
+                    WSErrorMessage(type="error", error="Catch-up failed").dict(),
+                    user_id in self.msgpack_connections,
+                ),
+            )
+        finally:
+            if redeliver and user_id in self.held_frames:
+                # Redelivered frames are older than the live ones held meanwhile
+                live = self.held_frames[user_id]
+                self.held_frames[user_id] = []
+                await self.redeliver_pending(user_id, caught_up)
+                self.held_frames[user_id].extend(live)
+            # Frames held while sending are sent in the same loop, keeping their order;
+            # a held event's frames are appended to the list as they are delivered
+            held = self.held_frames.get(user_id, [])
+            while held:
+                key, item = held.pop(0)
+                if key is None:
+                    await self._write(user_id, item)
+                elif key not in caught_up:
+                    await self._deliver(user_id, *item, {})
+            self.held_frames.pop(user_id, None)
+
+    def _catch_up_frame(self, user_id: int, rows: list, limit: int) -> dict:
+        known_senders = self.compact_known_senders.get(user_id)
+        to_message = message_from_row if known_senders is None else compact_message_from_row
+        rooms: dict[int, dict] = {}
+        # By string id, as in "users" frames
+        users: dict[str, dict] = {}
+        for row in rows:
+            room = rooms.get(row["room_id"])
+            if room is None:
+                room = rooms[row["room_id"]] = {
+                    "room_id": row["room_id"],
+                    "messages": [],
+                    "has_more": False,
+                }
+            if len(room["messages"]) == limit:
+                room["has_more"] = True
+                continue
+            room["messages"].append(to_message(row))
+            if known_senders is not None and str(row["sender_id"]) not in users:
+                users[str(row["sender_id"])] = user_from_row(row)
+
+        frame = {"type": "catch_up", "rooms": list(rooms.values())}
+        if known_senders is not None:
+            # Every sender in the frame, even ones a held "users" frame introduces later
+            known_senders.update(int(sender_id) for sender_id in users)
+            frame["users"] = users
+        return frame
+
+    async def _queue_for_batch(self, user_id: int, data: str | bytes):
+        outbox = self.batch_outboxes[user_id]
+        outbox.append(data)
+        if len(outbox) >= settings.WS_BATCH_MAX_FRAMES:
+            await self._flush_batch(user_id)
+        elif user_id not in self._batch_flush_tasks:
+            self._batch_flush_tasks[user_id] = create_untracked_task(
+                self._flush_batch_later(user_id)
+            )
+
+    async def _flush_batch_later(self, user_id: int):
+        await asyncio.sleep(settings.WS_BATCH_WINDOW_MS / 1000)
+        self._batch_flush_tasks.pop(user_id, None)
+        await self._flush_batch(user_id)
+
+    async def _flush_batch(self, user_id: int):
+        frames = self.batch_outboxes.get(user_id)
+        if not frames:
+            return
+        self.batch_outboxes[user_id] = []
+        await self.send_frame_to_user(user_id, batch_frames(frames), batch=False)
+
+    async def broadcast_to_room(
+        self,
+        room_id: int,
+        message: dict,
+        exclude_user_id: int = None,
+        compact_message: dict | None = None,
+        sender: dict | None = None,
+    ):
+        """Broadcast a message to all users in a room.
+
+        `compact_message` and `sender` are the alternative for compact-format
+        connections; without them every connection gets `message`.
+        """
+        # Publish to the bus for cross-server communication
+        await self.bus.publish(
+            room_id, encode_room_event(room_id, message, exclude_user_id, compact_message, sender)
+        )
+
+    def queue_reaction_delta(self, room_id: int, message_id: int, emoji: str, delta: int):
+        """Queue a reaction change, to be broadcast with others for the same message."""
+        _, deltas = self.reaction_deltas.setdefault(message_id, (room_id, Counter()))
+        deltas[emoji] += delta
+
+        if self._reaction_flush_task is None:
+            self._reaction_flush_task = create_untracked_task(self._flush_reaction_deltas())
+
+    async def _flush_reaction_deltas(self):
+        """Broadcast all reaction deltas queued during the coalescing window."""
+        await asyncio.sleep(settings.REACTION_BROADCAST_WINDOW_MS / 1000)
+        pending, self.reaction_deltas = self.reaction_deltas, {}
+        self._reaction_flush_task = None
+
+        for message_id, (room_id, deltas) in pending.items():
+            # Add and remove within one window cancel out
+            changed = {emoji: delta for emoji, delta in deltas.items() if delta}
+            if not changed:
+                continue
+            try:
+                await self.broadcast_to_room(
+                    room_id,
+                    WSReactionsMessage(
+                        type="reactions", room_id=room_id, message_id=message_id, deltas=changed
+                    ).dict(),
+                )
+            except Exception as e:
+                logger.error("failed_to_broadcast_reactions", message_id=message_id, error=str(e))
+
+    async def handle_event(self, data: str | bytes):
+        """Handle a room event from the message bus."""
         try:
             # Decode bytes to string if necessary
-            data_str = message["data"]
+            data_str = data
             if isinstance(data_str, bytes):
                 data_str = data_str.decode('utf-8')
-            
-            data = json.loads(data_str)
+
+            header, _, frames = data_str.partition("\n")
+            frame, _, compact = frames.partition("\n")
+            compact_frame, _, users_frame = compact.partition("\n")
+            data = orjson.loads(header)
             room_id = data["room_id"]
-            msg = data["message"]
             exclude_user_id = data.get("exclude_user_id")
-            
-            # Send to all subscribed users on this server
-            for user_id, subscriptions in self.user_subscriptions.items():
-                if room_id in subscriptions and user_id != exclude_user_id:
-                    await self.send_to_user(user_id, msg)
+            sender_id = data.get("sender_id")
+            message_id = data.get("message_id")
+            seq = data.get("seq")
+            published_at = data.get("published_at")
+            if published_at is not None:
+                PUBSUB_LISTENER_LAG.observe(time.time() - published_at)
+
+            # Send the encoded frame to all subscribed users on this server
+            packed: dict[str, bytes] = {}
+            for user_id, subscriptions in list(self.user_subscriptions.items()):
+                if room_id not in subscriptions or user_id == exclude_user_id:
+                    continue
+                if (
+                    message_id is not None
+                    and (pending := self.pending_frames.get(user_id)) is not None
+                ):
+                    self._track_pending(
+                        pending,
+                        message_id,
+                        (frame, compact_frame, users_frame, sender_id, room_id, seq),
+                    )
+                held = self.held_frames.get(user_id)
+                if held is not None and seq is not None:
+                    # Delivered after the catch-up frame, unless that contains the message
+                    held.append(((room_id, seq), (frame, compact_frame, users_frame, sender_id)))
+                    continue
+                await self._deliver(user_id, frame, compact_frame, users_frame, sender_id, packed)
+
+            if published_at is not None:
+                PUBSUB_DELIVERY_LATENCY.observe(time.time() - published_at)
         except Exception as e:
-            logger.error("failed_to_handle_redis_message", error=str(e))
-    
-    async def handle_message(self, user_id: int, user: User, data: dict):
+            logger.error("failed_to_handle_bus_event", error=str(e))
+
+    async def _deliver(  # noqa: PLR0913, PLR0917
+        self,
+        user_id: int,
+        frame: str,
+        compact_frame: str,
+        users_frame: str,
+        sender_id: int | None,
+        packed: dict[str, bytes],
+    ):
+        """Forward a room event in the user's format, introducing its sender if compact."""
+        known_senders = self.compact_known_senders.get(user_id)
+        if known_senders is None or not compact_frame:
+            await self._forward(user_id, frame, packed)
+            return
+        if sender_id not in known_senders:
+            known_senders.add(sender_id)
+            await self._forward(user_id, users_frame, packed)
+        await self._forward(user_id, compact_frame, packed)
+
+    async def _forward(self, user_id: int, frame: str, packed: dict[str, bytes]):
+        """Forward a JSON frame from pub/sub, re-encoded once per event for MessagePack."""
+        if user_id not in self.msgpack_connections:
+            await self.send_frame_to_user(user_id, frame)
+            return
+        if frame not in packed:
+            packed[frame] = msgpack.packb(orjson.loads(frame))
+        await self.send_frame_to_user(user_id, packed[frame])
+
+    async def handle_message(self, user_id: int, user: User, msg: WSClientMessage):
         """Handle incoming WebSocket message."""
-        message_type = data.get("type")
-        
         try:
-            if message_type == "subscribe":
-                msg = WSSubscribeMessage(**data)
+            if isinstance(msg, WSSubscribeMessage):
                 # Check if user is a member of the room
-                user_rooms = await message_service.get_user_rooms(user)
-                if msg.room_id not in user_rooms:
+                if not await chat_repository.is_member(msg.room_id, user_id):
                     await self.send_to_user(user_id, WSErrorMessage(
                         type="error",
                         error="You are not a member of this room"
@@ -151,42 +613,79 @@ class ConnectionManager:
                     type="success",
                     message=f"Subscribed to room {msg.room_id}"
                 ).dict())
-            
-            elif message_type == "unsubscribe":
-                msg = WSUnsubscribeMessage(**data)
+
+            elif isinstance(msg, WSSubscribeManyMessage):
+                # One membership query for the whole batch
+                member_rooms = set(await message_service.get_user_rooms(user))
+                requested = list(dict.fromkeys(msg.room_ids))
+                room_ids = [room_id for room_id in requested if room_id in member_rooms]
+                await self.subscribe_to_rooms(user_id, room_ids)
+                await self.send_to_user(
+                    user_id,
+                    WSSubscribedMessage(
+                        type="subscribed",
+                        room_ids=room_ids,
+                        rejected_room_ids=[r for r in requested if r not in member_rooms],
+                    ).dict(),
+                )
+
+            elif isinstance(msg, WSUnsubscribeMessage):
                 await self.unsubscribe_from_room(user_id, msg.room_id)
                 await self.send_to_user(user_id, WSSuccessMessage(
                     type="success",
                     message=f"Unsubscribed from room {msg.room_id}"
                 ).dict())
-            
-            elif message_type == "send_message":
-                msg = WSSendMessage(**data)
-                
+
+            elif isinstance(msg, WSAckMessage):
+                pending = self.pending_frames.get(user_id)
+                if pending:
+                    for message_id in msg.message_ids:
+                        pending.pop(message_id, None)
+
+            elif isinstance(msg, WSSendMessage):
                 # Save message to database
-                message = await message_service.save_message(
+                row, created = await message_service.save_message(
                     room_id=msg.room_id,
                     sender=user,
-                    content=msg.content
+                    content=msg.content,
+                    attachment_id=msg.attachment_id,
+                    client_msg_id=msg.client_msg_id,
                 )
-                
-                # Prepare message for broadcast
-                await message.fetch_related("sender")
-                message_response = MessageResponse.from_orm(message)
-                # Convert to JSON and back to ensure datetime serialization
-                message_dict = json.loads(message_response.json())
+
+                # Build the frames straight from the inserted row
                 broadcast_msg = {
                     "type": "message",
-                    "message": message_dict
+                    "room_id": row["room_id"],
+                    "seq": row["seq"],
+                    "message": message_from_row(row),
                 }
-                
+                compact_msg = {**broadcast_msg, "message": compact_message_from_row(row)}
+                sender = broadcast_msg["message"]["sender"]
+
+                if not created:
+                    # A retry: the room already has the message, only the sender gets it again
+                    await self._deliver(
+                        user_id,
+                        dumps(broadcast_msg).decode(),
+                        dumps(compact_msg).decode(),
+                        dumps({"type": "users", "users": {str(user_id): sender}}).decode(),
+                        user_id,
+                        {},
+                    )
+                    return
+
                 # Broadcast to room
-                await self.broadcast_to_room(msg.room_id, broadcast_msg)
-            
+                await self.broadcast_to_room(
+                    msg.room_id,
+                    broadcast_msg,
+                    compact_message=compact_msg,
+                    sender=sender,
+                )
+
             else:
                 await self.send_to_user(user_id, WSErrorMessage(
                     type="error",
-                    error=f"Unknown message type: {message_type}"
+                    error=f"Unknown message type: {msg.type}"
                 ).dict())
         
         except Exception as e:
@@ -198,4 +697,10 @@ class ConnectionManager:
 
 
 # Global connection manager instance
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager() 
+
+WS_CONNECTIONS.set_function(lambda: len(manager.active_connections))
+WS_SUBSCRIPTIONS.set_function(lambda: sum(map(len, manager.user_subscriptions.values())))
+WS_PENDING_FRAMES.set_function(lambda: sum(map(len, manager.pending_frames.values())))
+# Through manager.bus on each scrape, as the bus may be replaced
+PUBSUB_CHANNELS.set_function(lambda: manager.bus.channel_count())
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from structlog import get_logger
+
+from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.core.profiler import format_collapsed, sample_stacks
+from app.domains.auth.dependencies import get_current_admin_user
+from app.domains.auth.models import User
+
+logger = get_logger()
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+# One profile at a time; concurrent samplers would only skew each other
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/event-loop")
+async def get_event_loop_stalls(
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+) -> dict:
+    """Event-loop lag on this node and the most recent stalls, with the stack that blocked."""
+    return {
+        "interval_ms": settings.LOOP_MONITOR_INTERVAL_MS,
+        "stall_threshold_ms": settings.LOOP_STALL_THRESHOLD_MS,
+        "max_lag_ms": round(loop_monitor.max_lag * 1000, 1),
+        "stalls": list(reversed(loop_monitor.stalls)),
+    }
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(10, ge=1, le=1000),
+) -> PlainTextResponse:
+    """Sample every thread of this process and return collapsed stacks for a flame graph."""
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}",
+        )
+    if _profile_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="A profile is already running"
+        )
+
+    async with _profile_lock:
+        logger.info("profile_started", user_id=current_user.id, seconds=seconds)
+        # The sampler runs in a worker thread so the loop keeps serving the load it profiles
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+
+    logger.info("profile_finished", user_id=current_user.id, samples=sum(stacks.values()))
+    return PlainTextResponse(
+        format_collapsed(stacks),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
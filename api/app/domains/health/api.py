@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 router = APIRouter(tags=["health"])
 
@@ -7,3 +8,9 @@ router = APIRouter(tags=["health"])
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@router.get("/metrics", response_class=Response)
+async def metrics() -> Response:
+    """Prometheus metrics for this node."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -7,13 +7,24 @@ from structlog import get_logger
 
 from app.core.config import settings
 from app.core.db import close_db, init_db
+from app.core.file_cache import file_cache
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import PrometheusMiddleware
+from app.core.query_stats import QueryStatsMiddleware
 from app.core.redis import redis_service
 from app.core.s3 import s3_service
+from app.core.serialization import ORJSONResponse
 from app.domains.auth.api import router as auth_router
+from app.domains.auth.attachment_service import attachment_service
+from app.domains.auth.attachments_api import router as attachments_router
+from app.domains.auth.bootstrap_api import router as bootstrap_router
 from app.domains.auth.contacts_api import router as contacts_router
-from app.domains.auth.messages_api import redis_listener
+from app.domains.auth.files_api import router as files_router
+from app.domains.auth.messages_api import bus_listener
 from app.domains.auth.messages_api import router as messages_router
 from app.domains.auth.rooms_api import router as rooms_router
+from app.domains.auth.websocket_manager import manager
+from app.domains.debug.api import router as debug_router
 from app.domains.health.api import router as health_router
 
 logger = get_logger()
@@ -29,6 +40,10 @@ async def startup_event():
     await s3_service.get_session()
     logger.info("s3_initialized")
 
+    # Initialize local file cache
+    await file_cache.initialize()
+    logger.info("file_cache_initialized")
+
 
 async def shutdown_event():
     # Close Redis connection
@@ -38,26 +53,40 @@ async def shutdown_event():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    loop_monitor.start()
     await init_db()
     await startup_event()
 
-    # Start Redis listener for WebSocket messages
-    redis_task = asyncio.create_task(redis_listener())
+    # Start the message bus listener for WebSocket messages
+    bus_task = asyncio.create_task(bus_listener())
+    # Delete attachments that were uploaded but never sent
+    cleanup_task = asyncio.create_task(attachment_service.run_cleanup())
 
     yield
 
-    # Cancel Redis listener
-    redis_task.cancel()
-    try:
-        await redis_task
-    except asyncio.CancelledError:
-        pass
+    # Cancel the message bus listener and attachment cleanup
+    for task in (bus_task, cleanup_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await manager.bus.close()
 
     await close_db()
     await shutdown_event()
+    await loop_monitor.stop()
+
 
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    version=settings.VERSION,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 # Set all CORS enabled origins
 app.add_middleware(
@@ -74,3 +103,7 @@ app.include_router(auth_router, prefix="/v1")
 app.include_router(contacts_router, prefix="/v1")
 app.include_router(rooms_router, prefix="/v1")
 app.include_router(messages_router, prefix="/v1")
+app.include_router(files_router, prefix="/v1")
+app.include_router(attachments_router, prefix="/v1")
+app.include_router(bootstrap_router, prefix="/v1")
+app.include_router(debug_router, prefix="/v1")
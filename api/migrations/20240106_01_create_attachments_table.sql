@@ -0,0 +1,22 @@
+-- Create content-addressed, reference-counted attachments table
+CREATE TABLE IF NOT EXISTS attachments (
+    id SERIAL PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL UNIQUE,
+    object_name VARCHAR(255) NOT NULL,
+    content_type VARCHAR(255) NOT NULL,
+    size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    uploaded_by_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Messages reference attachments; an attachment cannot be dropped while referenced
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS attachment_id INTEGER REFERENCES attachments(id) ON DELETE RESTRICT;
+
+CREATE INDEX idx_messages_attachment_id ON messages(attachment_id);
+
+-- Create updated_at trigger
+CREATE TRIGGER update_attachments_updated_at BEFORE UPDATE
+    ON attachments FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,20 @@
+-- Create reactions table and pre-aggregated per-message counters
+CREATE TABLE IF NOT EXISTS reactions (
+    id SERIAL PRIMARY KEY,
+    message_id INTEGER NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    emoji VARCHAR(32) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(message_id, user_id, emoji)
+);
+
+-- {emoji: count} per message, so history pages need no COUNT queries
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS reaction_counts JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- Create indexes for reactions
+CREATE INDEX idx_reactions_user_id ON reactions(user_id);
+
+-- Create updated_at trigger
+CREATE TRIGGER update_reactions_updated_at BEFORE UPDATE
+    ON reactions FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,21 @@
+-- Dense per-room message sequence numbers for ordering and gap detection
+
+ALTER TABLE rooms ADD COLUMN IF NOT EXISTS last_seq INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS seq INTEGER;
+
+-- Backfill existing messages in insert order
+UPDATE messages m
+SET seq = numbered.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY room_id ORDER BY id) AS seq
+    FROM messages
+) numbered
+WHERE m.id = numbered.id;
+
+UPDATE rooms r
+SET last_seq = COALESCE((SELECT MAX(seq) FROM messages m WHERE m.room_id = r.id), 0);
+
+ALTER TABLE messages ALTER COLUMN seq SET NOT NULL;
+
+-- Also serves range lookups by (room_id, seq)
+ALTER TABLE messages ADD CONSTRAINT uq_messages_room_id_seq UNIQUE (room_id, seq);
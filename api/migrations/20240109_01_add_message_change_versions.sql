@@ -0,0 +1,9 @@
+-- Message edit/delete support with per-room change versions for incremental sync
+
+ALTER TABLE rooms ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- Only changed messages are ever looked up by version
+CREATE INDEX idx_messages_room_id_version ON messages(room_id, version) WHERE version > 0;
@@ -0,0 +1,7 @@
+-- Client-chosen message ids, so a retried send does not insert the message twice
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS client_msg_id VARCHAR(64);
+
+-- Unique per sender; messages sent without an id are left out of the index
+CREATE UNIQUE INDEX IF NOT EXISTS uq_messages_sender_id_client_msg_id
+    ON messages(sender_id, client_msg_id) WHERE client_msg_id IS NOT NULL;
@@ -0,0 +1,9 @@
+-- Read position of each member, for unread counts
+
+ALTER TABLE room_members ADD COLUMN IF NOT EXISTS last_read_seq INTEGER NOT NULL DEFAULT 0;
+
+-- Existing members start with everything read
+UPDATE room_members rm
+SET last_read_seq = r.last_seq
+FROM rooms r
+WHERE r.id = rm.room_id;
@@ -0,0 +1,2 @@
+-- Files are authorized by looking up the attachment stored under the requested name
+CREATE UNIQUE INDEX IF NOT EXISTS uq_attachments_object_name ON attachments(object_name);
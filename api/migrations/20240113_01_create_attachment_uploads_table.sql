@@ -0,0 +1,26 @@
+-- Uploads not sent in a message yet: a message may only reference an attachment its
+-- sender uploaded or can already see in one of their rooms, and content with pending
+-- uploads outlives its last message
+CREATE TABLE IF NOT EXISTS attachment_uploads (
+    id SERIAL PRIMARY KEY,
+    attachment_id INTEGER NOT NULL REFERENCES attachments(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(attachment_id, user_id)
+);
+
+CREATE INDEX idx_attachment_uploads_user_id ON attachment_uploads(user_id);
+
+-- Existing attachments their recorded uploader has not sent yet
+INSERT INTO attachment_uploads (attachment_id, user_id)
+SELECT a.id, a.uploaded_by_id FROM attachments a
+WHERE a.uploaded_by_id IS NOT NULL
+  AND NOT EXISTS (
+      SELECT 1 FROM messages m WHERE m.attachment_id = a.id AND m.sender_id = a.uploaded_by_id
+  )
+ON CONFLICT DO NOTHING;
+
+-- Create updated_at trigger
+CREATE TRIGGER update_attachment_uploads_updated_at BEFORE UPDATE
+    ON attachment_uploads FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""In-process micro-benchmarks for the server's hot paths.
+
+Runs each benchmark against fakes (in-memory sockets, an in-memory SQLite database)
+and reports the time per operation over several rounds. The fastest round is the
+least disturbed by noise and is what gets compared; results can be saved as a
+baseline and compared against it so regressions show up in review.
+
+Usage:
+    python perf/bench.py                       # run and compare with perf/baseline.json
+    python perf/bench.py --save-baseline       # run and store the results as the baseline
+    python perf/bench.py -k fanout --rounds 9  # run a subset
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+# Settings require connection details even though nothing connects to them here
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "bench")
+for name in ("S3_ENDPOINT", "S3_ACCESS_KEY", "S3_SECRET_KEY", "S3_BUCKET_NAME"):
+    os.environ.setdefault(name, "bench")
+
+from tortoise import Tortoise  # noqa: E402
+
+from app.domains.auth.message_schemas import MessageHistoryResponse  # noqa: E402
+from app.domains.auth.message_service import message_service  # noqa: E402
+from app.domains.auth.messages_api import _history_response  # noqa: E402
+from app.domains.auth.models import Message, Room, RoomMember, User  # noqa: E402
+from app.domains.auth.repository import message_from_row  # noqa: E402
+from app.domains.auth.rooms_api import get_rooms  # noqa: E402
+from app.domains.auth.service import auth_service  # noqa: E402
+from app.domains.auth.websocket_manager import (  # noqa: E402
+    ConnectionManager,
+    encode_room_event,
+    parse_client_frame,
+)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+Operation = Callable[[], Awaitable[object]]
+
+# name -> (setup returning the operation to time, operations per round)
+BENCHMARKS: dict[str, tuple[Callable[[], Awaitable[Operation]], int]] = {}
+
+
+def benchmark(name: str, number: int):
+    """Register a benchmark. The decorated coroutine sets up fakes and returns the operation."""
+
+    def decorator(setup: Callable[[], Awaitable[Operation]]):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+
+    return decorator
+
+
+class FakeWebSocket:
+    """Accepts frames like a connected client and throws them away."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def send_json(self, data: dict) -> None:
+        # Starlette encodes every send_json call like this before sending
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.frames += 1
+
+    async def send_text(self, data: str) -> None:
+        self.frames += 1
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.frames += 1
+
+
+def _typed_rows(rows: list) -> list[dict]:
+    """SQLite returns timestamps as text; asyncpg returns datetimes. Match Postgres."""
+    return [
+        {
+            key: datetime.fromisoformat(value)
+            if key.endswith("_at") and isinstance(value, str)
+            else value
+            for key, value in dict(row).items()
+        }
+        for row in rows
+    ]
+
+
+async def _create_users(count: int, prefix: str) -> list[User]:
+    return [await User.create(username=f"{prefix}{i}", hashed_password="x") for i in range(count)]
+
+
+async def _fanout(prefix: str, binary: bool) -> Operation:
+    manager = ConnectionManager()
+    for user_id in range(1000):
+        manager.active_connections[user_id] = FakeWebSocket()
+        manager.user_subscriptions[user_id] = {1, user_id + 2}
+        if binary:
+            manager.msgpack_connections.add(user_id)
+
+    users = await _create_users(1, prefix)
+    room = await Room.create(name="fanout", owner=users[0])
+    await RoomMember.create(room=room, user=users[0])
+    await Message.create(room=room, seq=1, sender=users[0], content="x" * 200)
+    rows, _ = await message_service.get_room_messages(room.id, users[0], limit=1)
+    frame = {"type": "message", "room_id": 1, "seq": 1, "message": message_from_row(rows[0])}
+    data = encode_room_event(1, frame)
+
+    async def op():
+        await manager.handle_event(data)
+
+    return op
+
+
+@benchmark("redis_fanout_1000", number=100)
+async def bench_redis_fanout() -> Operation:
+    """One pub/sub message fanned out to 1000 sockets subscribed to the room."""
+    return await _fanout("fanout", binary=False)
+
+
+@benchmark("redis_fanout_1000_msgpack", number=100)
+async def bench_redis_fanout_msgpack() -> Operation:
+    """The same fan-out to sockets on the MessagePack subprotocol."""
+    return await _fanout("fanoutmp", binary=True)
+
+
+async def _history_rows(count: int, prefix: str) -> list[dict]:
+    users = await _create_users(5, prefix)
+    room = await Room.create(name="history", owner=users[0])
+    for user in users:
+        await RoomMember.create(room=room, user=user)
+    for seq in range(1, count + 1):
+        await Message.create(
+            room=room,
+            seq=seq,
+            sender=users[seq % len(users)],
+            content=f"message {seq} " + "x" * 100,
+            reaction_counts={"👍": seq % 4} if seq % 3 else {},
+        )
+    rows, _ = await message_service.get_room_messages(room.id, users[0], limit=count)
+    return _typed_rows(rows)
+
+
+@benchmark("history_page_100_pydantic", number=100)
+async def bench_history_pydantic() -> Operation:
+    """A 100-message history page through nested Pydantic models, for comparison."""
+    rows = await _history_rows(100, "pydantic")
+
+    async def op():
+        return MessageHistoryResponse.model_validate(
+            {"messages": [message_from_row(row) for row in rows], "has_more": True}
+        ).model_dump_json()
+
+    return op
+
+
+@benchmark("history_page_100_orjson", number=100)
+async def bench_history_orjson() -> Operation:
+    """A 100-message history page encoded straight from rows, as the history route does."""
+    rows = await _history_rows(100, "orjson")
+
+    async def op():
+        return _history_response(rows, True).body
+
+    return op
+
+
+@benchmark("history_page_100_compact", number=100)
+async def bench_history_compact() -> Operation:
+    """The same page in the compact format, with each sender listed once."""
+    rows = await _history_rows(100, "compact")
+
+    async def op():
+        return _history_response(rows, True, compact=True).body
+
+    return op
+
+
+@benchmark("parse_send_message_frame", number=2000)
+async def bench_parse_frame() -> Operation:
+    """Validating one inbound send_message frame against the client frame union."""
+    frame = json.dumps({"type": "send_message", "room_id": 1, "content": "x" * 200})
+
+    async def op():
+        return parse_client_frame(frame)
+
+    return op
+
+
+@benchmark("verify_token", number=2000)
+async def bench_verify_token() -> Operation:
+    """Decoding and validating one JWT, as every request and WebSocket auth does."""
+    token = auth_service.create_access_token({"sub": "benchuser"})
+
+    async def op():
+        return auth_service.verify_token(token)
+
+    return op
+
+
+@benchmark("get_rooms_20x5", number=20)
+async def bench_get_rooms() -> Operation:
+    """The room list for a user in 20 rooms of 5 members each, against SQLite."""
+    users = await _create_users(5, "rooms")
+    for i in range(20):
+        room = await Room.create(name=f"room {i}", owner=users[0])
+        for user in users:
+            await RoomMember.create(room=room, user=user)
+
+    async def op():
+        return await get_rooms(current_user=users[0])
+
+    return op
+
+
+async def _time_rounds(op: Operation, number: int, rounds: int) -> list[float]:
+    """Time `rounds` batches of `number` calls; returns seconds per call for each round."""
+    for _ in range(max(1, number // 10)):
+        await op()
+
+    timings = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(number):
+                await op()
+            timings.append((time.perf_counter() - started) / number)
+        finally:
+            gc.enable()
+    return timings
+
+
+async def run_benchmarks(names: list[str], rounds: int) -> dict[str, dict[str, float]]:
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["app.domains.auth.models"]})
+    await Tortoise.generate_schemas()
+    try:
+        results = {}
+        for name in names:
+            setup, number = BENCHMARKS[name]
+            op = await setup()
+            timings = await _time_rounds(op, number, rounds)
+            results[name] = {
+                "median_us": round(statistics.median(timings) * 1e6, 2),
+                "min_us": round(min(timings) * 1e6, 2),
+                "stdev_us": round(statistics.stdev(timings) * 1e6, 2) if rounds > 1 else 0.0,
+            }
+            print(f"{name:<32} {results[name]['min_us']:>12.2f} us/op")
+        return results
+    finally:
+        await Tortoise.close_connections()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print the change against the baseline and return the regressed benchmark names."""
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {'-':>12} {result['min_us']:>12.2f} {'new':>8}")
+            continue
+        before = baseline[name]["min_us"]
+        change = (result["min_us"] - before) / before
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<32} {before:>12.2f} {result['min_us']:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="filter", default="", help="run benchmarks matching this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="relative slowdown counted as regression"
+    )
+    parser.add_argument("--output", type=Path, help="also write the results JSON here")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = asyncio.run(run_benchmarks(names, args.rounds))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Throughput and latency of the message bus backends.
+
+Publishes room events through each selected backend, as fast as it accepts them,
+while a listener on the same process receives them. Reports the publish rate, the
+end-to-end rate and publish-to-receive latency percentiles per backend. The memory
+backend runs anywhere; redis and postgres connect to REDIS_URL and DATABASE_URL (or
+the POSTGRES_* settings) like the server does.
+
+Usage:
+    python perf/bus_bench.py --backends memory,redis,postgres --events 5000 --size 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+# Settings require these even for backends that do not use them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "bench")
+for name in ("S3_ENDPOINT", "S3_ACCESS_KEY", "S3_SECRET_KEY", "S3_BUCKET_NAME"):
+    os.environ.setdefault(name, "bench")
+
+from tortoise import Tortoise  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import TORTOISE_ORM  # noqa: E402
+from app.core.message_bus import create_message_bus  # noqa: E402
+from app.domains.auth.websocket_manager import encode_room_event  # noqa: E402
+from perf.load_test import percentile  # noqa: E402
+
+BENCH_ROOM_ID = 2**31 - 1
+
+
+async def bench_backend(backend: str, events: int, size: int, timeout: float) -> dict:
+    settings.MESSAGE_BUS = backend
+    bus = create_message_bus()
+    await bus.connect()
+    await bus.add_rooms([BENCH_ROOM_ID])
+
+    latencies_ms: list[float] = []
+    done = asyncio.Event()
+
+    async def on_event(data: str | bytes) -> None:
+        received_at = time.time()
+        header = json.loads(data.partition(b"\n" if isinstance(data, bytes) else "\n")[0])
+        if header["room_id"] != BENCH_ROOM_ID:
+            return
+        latencies_ms.append((received_at - header["published_at"]) * 1000)
+        if len(latencies_ms) == events:
+            done.set()
+
+    listener = asyncio.create_task(bus.listen(on_event))
+    frame = {"type": "message", "room_id": BENCH_ROOM_ID, "content": "x" * size}
+
+    started = time.perf_counter()
+    for _ in range(events):
+        await bus.publish(BENCH_ROOM_ID, encode_room_event(BENCH_ROOM_ID, frame))
+    published_s = time.perf_counter() - started
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    except TimeoutError:
+        pass
+    received_s = time.perf_counter() - started
+
+    listener.cancel()
+    await bus.remove_rooms([BENCH_ROOM_ID])
+    await bus.close()
+
+    latencies = sorted(latencies_ms)
+    return {
+        "events": events,
+        "received": len(latencies),
+        "publish_per_s": round(events / published_s, 1),
+        "end_to_end_per_s": round(len(latencies) / received_s, 1),
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "max": percentile(latencies, 100),
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict]:
+    backends = args.backends.split(",")
+    # Publishing goes through the ORM connection, as in the server
+    uses_orm = "postgres" in backends
+    if uses_orm:
+        await Tortoise.init(config=TORTOISE_ORM)
+
+    results = {}
+    try:
+        for backend in backends:
+            results[backend] = await bench_backend(backend, args.events, args.size, args.timeout)
+            print(f"{backend:<10} {json.dumps(results[backend])}")
+        # Before teardown, so a failing close does not lose the results
+        if args.output:
+            args.output.write_text(json.dumps(results, indent=2) + "\n")
+    finally:
+        if uses_orm:
+            await Tortoise.close_connections()
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="memory,redis,postgres")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=500, help="message content length")
+    parser.add_argument("--timeout", type=float, default=30, help="wait for deliveries, seconds")
+    parser.add_argument("--output", type=Path, help="also write the results JSON here")
+    return parser.parse_args()
+
+
+def main() -> None:
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
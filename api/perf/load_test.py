@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+"""Asyncio load generator simulating many concurrent chat users.
+
+Registers and logs in N users, wires them into contact pairs and group rooms through
+the REST API, then holds N concurrent `/v1/messages/ws` sessions sending messages at a
+target aggregate rate. Reports end-to-end delivery latency percentiles, losses,
+duplicates and server error frames, and writes the results as JSON.
+
+Usage:
+    python perf/load_test.py --users 1000 --rate 50 --duration 60 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+import msgpack
+import websockets
+from websockets.asyncio.client import ClientConnection
+
+MARKER = "lt"
+
+
+class CountingConnection(ClientConnection):
+    """Counts bytes read off the socket, i.e. after any compression."""
+
+    wire_bytes = 0
+
+    def data_received(self, data: bytes) -> None:
+        CountingConnection.wire_bytes += len(data)
+        super().data_received(data)
+
+
+@dataclass
+class LoadUser:
+    username: str
+    token: str = ""
+    user_id: int = 0
+    room_ids: list[int] = field(default_factory=list)
+    ws: Any = None
+
+
+@dataclass
+class SentMessage:
+    sent_at: float
+    expected: set[int]
+
+
+@dataclass
+class Stats:
+    sent: dict[int, SentMessage] = field(default_factory=dict)
+    received: dict[int, set[int]] = field(default_factory=dict)
+    latencies_ms: list[float] = field(default_factory=list)
+    duplicates: int = 0
+    unexpected: int = 0
+    errors: Counter[str] = field(default_factory=Counter)
+    send_failures: int = 0
+    frames_received: int = 0
+    bytes_received: int = 0
+    ws_messages_received: int = 0
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return round(sorted_values[index], 3)
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:8]
+        self.api = f"{args.base_url.rstrip('/')}/v1"
+        self.ws_url = self.api.replace("http", "ws", 1) + "/messages/ws"
+        self.users = [LoadUser(username=f"{MARKER}{self.run_id}u{i}") for i in range(args.users)]
+        self.room_members: dict[int, list[LoadUser]] = {}
+        self.stats = Stats()
+        self.timings: dict[str, float] = {}
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+
+    # Setup through the REST API
+
+    async def _post(self, client: httpx.AsyncClient, path: str, user: LoadUser | None, **kwargs):
+        headers = {"Authorization": f"Bearer {user.token}"} if user else {}
+        async with self.semaphore:
+            response = await client.post(f"{self.api}{path}", headers=headers, **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    async def _register(self, client: httpx.AsyncClient, user: LoadUser) -> None:
+        credentials = {"username": user.username, "password": self.args.password}
+        created = await self._post(client, "/auth/register", None, json=credentials)
+        token = await self._post(client, "/auth/login", None, json=credentials)
+        user.user_id = created["id"]
+        user.token = token["access_token"]
+
+    async def _connect_contacts(
+        self, client: httpx.AsyncClient, owner: LoadUser, other: LoadUser
+    ) -> None:
+        invitation = await self._post(
+            client, "/contacts/invite", owner, json={"username": other.username}
+        )
+        await self._post(client, f"/contacts/{invitation['id']}/accept", other)
+
+    async def _create_group(self, client: httpx.AsyncClient, members: list[LoadUser]) -> None:
+        owner, *others = members
+        await asyncio.gather(*(self._connect_contacts(client, owner, o) for o in others))
+        room = await self._post(
+            client,
+            "/rooms",
+            owner,
+            json={
+                "name": f"{MARKER}{self.run_id}g{owner.user_id}",
+                "member_usernames": [o.username for o in others],
+            },
+        )
+        self.room_members[room["id"]] = members
+        for member in members:
+            member.room_ids.append(room["id"])
+
+    async def setup(self) -> None:
+        timeout = httpx.Timeout(60.0)
+        limits = httpx.Limits(max_connections=self.args.concurrency)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(self._register(client, u) for u in self.users))
+            self.timings["register_login_s"] = time.perf_counter() - started
+            print(f"registered and logged in {len(self.users)} users")
+
+            started = time.perf_counter()
+            size = self.args.group_size
+            groups = [self.users[i : i + size] for i in range(0, len(self.users), size)]
+            await asyncio.gather(*(self._create_group(client, g) for g in groups if len(g) > 1))
+            self.timings["groups_s"] = time.perf_counter() - started
+            print(f"created {len(self.room_members)} group rooms of up to {size} members")
+
+    # WebSocket sessions
+
+    async def _open_session(self, user: LoadUser) -> None:
+        async with self.semaphore:
+            user.ws = await websockets.connect(
+                self.ws_url,
+                max_size=None,
+                open_timeout=60,
+                subprotocols=[f"chat.{self.args.protocol}"],
+                compression=None if self.args.compression == "none" else self.args.compression,
+                create_connection=CountingConnection,
+            )
+            subscribe = self.args.subscribe
+            auth = {
+                "type": "auth",
+                "token": user.token,
+                "batch": self.args.batch,
+                "subscribe_all": subscribe == "all",
+            }
+            await user.ws.send(self._encode(auth))
+            await self._expect_success(user)
+            if subscribe == "all":
+                await self._expect_success(user, "subscribed")
+            elif subscribe == "many":
+                await user.ws.send(
+                    self._encode({"type": "subscribe_many", "room_ids": user.room_ids})
+                )
+                await self._expect_success(user, "subscribed")
+            else:
+                for room_id in user.room_ids:
+                    await user.ws.send(self._encode({"type": "subscribe", "room_id": room_id}))
+                    await self._expect_success(user)
+
+    def _encode(self, frame: dict) -> str | bytes:
+        if self.args.protocol == "msgpack":
+            return msgpack.packb(frame)
+        return json.dumps(frame)
+
+    def _decode(self, raw: str | bytes) -> Any:
+        if isinstance(raw, bytes):
+            return msgpack.unpackb(raw)
+        return json.loads(raw)
+
+    async def _expect_success(self, user: LoadUser, frame_type: str = "success") -> None:
+        frame = self._decode(await user.ws.recv())
+        if frame.get("type") != frame_type:
+            raise RuntimeError(f"{user.username}: unexpected frame during setup: {frame}")
+
+    async def _receive_loop(self, user: LoadUser) -> None:
+        async for raw in user.ws:
+            received_at = time.perf_counter()
+            self.stats.ws_messages_received += 1
+            self.stats.bytes_received += len(raw)
+            frame = self._decode(raw)
+            for event in frame if isinstance(frame, list) else [frame]:
+                self._record_event(user, event, received_at)
+
+    def _record_event(self, user: LoadUser, event: dict, received_at: float) -> None:
+        stats = self.stats
+        stats.frames_received += 1
+        event_type = event.get("type")
+        if event_type == "error":
+            stats.errors[event.get("error", "")] += 1
+            return
+        if event_type != "message":
+            return
+
+        prefix, _, message_no = event["message"]["content"].rpartition(":")
+        if prefix != f"{MARKER}:{self.run_id}":
+            return
+        message_no = int(message_no)
+        sent = stats.sent.get(message_no)
+        if sent is None or user.user_id not in sent.expected:
+            stats.unexpected += 1
+            return
+
+        receivers = stats.received.setdefault(message_no, set())
+        if user.user_id in receivers:
+            stats.duplicates += 1
+            return
+        receivers.add(user.user_id)
+        stats.latencies_ms.append((received_at - sent.sent_at) * 1000)
+
+    # Send phase
+
+    async def _send_loop(self) -> None:
+        senders = [u for u in self.users if u.room_ids]
+        interval = 1 / self.args.rate
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        message_no = 0
+
+        while (next_send := started + message_no * interval) < deadline:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            user = random.choice(senders)
+            room_id = random.choice(user.room_ids)
+            content = f"{MARKER}:{self.run_id}:{message_no}"
+            self.stats.sent[message_no] = SentMessage(
+                sent_at=time.perf_counter(),
+                expected={m.user_id for m in self.room_members[room_id]},
+            )
+            try:
+                await user.ws.send(
+                    self._encode({"type": "send_message", "room_id": room_id, "content": content})
+                )
+            except websockets.ConnectionClosed:
+                self.stats.send_failures += 1
+                del self.stats.sent[message_no]
+            message_no += 1
+
+        self.timings["send_s"] = time.perf_counter() - started
+
+    async def run(self) -> dict:
+        await self.setup()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self._open_session(u) for u in self.users))
+        self.timings["connect_s"] = time.perf_counter() - started
+        print(f"opened {len(self.users)} websocket sessions")
+
+        receivers = [asyncio.create_task(self._receive_loop(u)) for u in self.users]
+        print(f"sending at {self.args.rate} msg/s for {self.args.duration}s")
+        await self._send_loop()
+        await asyncio.sleep(self.args.drain)
+
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*(u.ws.close() for u in self.users), return_exceptions=True)
+        return self.report()
+
+    def report(self) -> dict:
+        stats = self.stats
+        expected = sum(len(s.expected) for s in stats.sent.values())
+        delivered = sum(len(r) for r in stats.received.values())
+        latencies = sorted(stats.latencies_ms)
+        return {
+            "run_id": self.run_id,
+            "config": {
+                "users": self.args.users,
+                "group_size": self.args.group_size,
+                "rate": self.args.rate,
+                "duration_s": self.args.duration,
+                "protocol": self.args.protocol,
+                "compression": self.args.compression,
+                "batch": self.args.batch,
+                "subscribe": self.args.subscribe,
+            },
+            "timings_s": {k: round(v, 3) for k, v in self.timings.items()},
+            "messages_sent": len(stats.sent),
+            "achieved_rate": round(len(stats.sent) / self.timings["send_s"], 2),
+            "deliveries_expected": expected,
+            "deliveries": delivered,
+            "lost": expected - delivered,
+            "loss_ratio": round((expected - delivered) / expected, 6) if expected else 0.0,
+            "duplicates": stats.duplicates,
+            "unexpected": stats.unexpected,
+            "send_failures": stats.send_failures,
+            "frames_received": stats.frames_received,
+            "ws_messages_received": stats.ws_messages_received,
+            "bytes_received": stats.bytes_received,
+            "wire_bytes_received": CountingConnection.wire_bytes,
+            "error_frames": dict(stats.errors),
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": percentile(latencies, 100),
+            },
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--group-size", type=int, default=20, help="members per group room")
+    parser.add_argument("--rate", type=float, default=50, help="aggregate messages per second")
+    parser.add_argument("--duration", type=float, default=60, help="send phase, seconds")
+    parser.add_argument("--drain", type=float, default=5, help="wait for deliveries, seconds")
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel setup requests")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument(
+        "--protocol", choices=["json", "msgpack"], default="json", help="WebSocket subprotocol"
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["deflate", "none"],
+        default="deflate",
+        help="offer permessage-deflate",
+    )
+    parser.add_argument("--batch", action="store_true", help="ask for batched array frames")
+    parser.add_argument(
+        "--subscribe",
+        choices=["each", "many", "all"],
+        default="each",
+        help="one subscribe frame per room, one subscribe_many frame, or subscribe_all at auth",
+    )
+    parser.add_argument("--output", default="load_test_results.json")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    results = await LoadTest(args).run()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results have been written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,17 @@
+import uuid
+
+import boto3
 import pytest
 from fastapi.testclient import TestClient
+from testcontainers.core.container import DockerContainer
+from testcontainers.core.waiting_utils import wait_for_logs
 from testcontainers.postgres import PostgresContainer
 
 from app.core.config import settings
+from app.core.db import TORTOISE_ORM
+from app.core.file_cache import file_cache
+from app.core.message_bus import InMemoryMessageBus
+from app.domains.auth.websocket_manager import manager
 from app.main import app
 
 
@@ -23,8 +32,96 @@ def postgres_container():
 
 
 @pytest.fixture(scope="session")
-def test_client(postgres_container):
+def minio_container():
+    container = (
+        DockerContainer("minio/minio")
+        .with_env("MINIO_ROOT_USER", "minioadmin")
+        .with_env("MINIO_ROOT_PASSWORD", "minioadmin")
+        .with_command("server /data")
+        .with_exposed_ports(9000)
+    )
+    container.start()
+    wait_for_logs(container, "API:")
+    endpoint = f"http://{container.get_container_host_ip()}:{container.get_exposed_port(9000)}"
+    yield container, endpoint
+    container.stop()
+
+
+@pytest.fixture(scope="session")
+def test_client(postgres_container, minio_container, tmp_path_factory):
     # Update database URL to use the container
     settings.DATABASE_URL = postgres_container[1]
+    TORTOISE_ORM["connections"]["default"] = postgres_container[1]
+
+    settings.S3_ENDPOINT = minio_container[1]
+    settings.S3_ACCESS_KEY = "minioadmin"
+    settings.S3_SECRET_KEY = "minioadmin"
+    boto3.client(
+        "s3",
+        endpoint_url=settings.S3_ENDPOINT,
+        aws_access_key_id=settings.S3_ACCESS_KEY,
+        aws_secret_access_key=settings.S3_SECRET_KEY,
+        region_name=settings.S3_REGION,
+    ).create_bucket(Bucket=settings.S3_BUCKET_NAME)
+    file_cache.directory = tmp_path_factory.mktemp("files")
+
+    # A single process needs no Redis between nodes
+    settings.MESSAGE_BUS = "memory"
+    manager.bus = InMemoryMessageBus()
+
     with TestClient(app) as client:
         yield client
+
+
+@pytest.fixture
+def make_user(test_client):
+    """Register and log in a new user; returns the user and its auth headers."""
+
+    def make() -> tuple[dict, dict]:
+        credentials = {"username": f"user{uuid.uuid4().hex[:12]}", "password": "password123"}
+        user = test_client.post("/v1/auth/register", json=credentials).json()
+        token = test_client.post("/v1/auth/login", json=credentials).json()["access_token"]
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def make_room(test_client):
+    """Create a room owned by `owner` with `members` (made contacts first); returns its id."""
+
+    def make(owner: tuple[dict, dict], *members: tuple[dict, dict]) -> int:
+        owner_headers = owner[1]
+        for user, headers in members:
+            invitation = test_client.post(
+                "/v1/contacts/invite", json={"username": user["username"]}, headers=owner_headers
+            ).json()
+            test_client.post(f"/v1/contacts/{invitation['id']}/accept", headers=headers)
+
+        response = test_client.post(
+            "/v1/rooms",
+            json={"name": "test", "member_usernames": [user["username"] for user, _ in members]},
+            headers=owner_headers,
+        )
+        return response.json()["id"]
+
+    return make
+
+
+@pytest.fixture
+def send_message(test_client):
+    """Send a message over the WebSocket; returns the first frame answering it."""
+
+    def send(headers: dict, room_id: int, content: str, **fields) -> dict:
+        token = headers["Authorization"].removeprefix("Bearer ")
+        with test_client.websocket_connect("/v1/messages/ws") as websocket:
+            websocket.send_json({"type": "auth", "token": token})
+            assert websocket.receive_json()["type"] == "success"
+            websocket.send_json({"type": "subscribe", "room_id": room_id})
+            assert websocket.receive_json()["type"] == "success"
+            websocket.send_json(
+                {"type": "send_message", "room_id": room_id, "content": content, **fields}
+            )
+            return websocket.receive_json()
+
+    return send
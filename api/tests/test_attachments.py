@@ -0,0 +1,146 @@
+"""Tests for attachment deduplication, access and cleanup."""
+
+import asyncio
+import os
+from http import HTTPStatus
+
+from app.core.config import settings
+from app.domains.auth.attachment_service import AttachmentService, attachment_service
+
+
+def upload(test_client, headers: dict, content: bytes) -> tuple[int, dict]:
+    response = test_client.post(
+        "/v1/attachments", content=content, headers={**headers, "Content-Type": "image/png"}
+    )
+    return response.status_code, response.json()
+
+
+def test_identical_uploads_share_one_attachment(test_client, make_user):
+    _, first_headers = make_user()
+    _, second_headers = make_user()
+    _, outsider_headers = make_user()
+    content = os.urandom(64)
+
+    status_code, first = upload(test_client, first_headers, content)
+    assert status_code == HTTPStatus.CREATED
+    status_code, second = upload(test_client, second_headers, content)
+    assert status_code == HTTPStatus.OK
+    assert second["id"] == first["id"]
+
+    # Both uploaders can find it by hash, nobody else can
+    lookup_url = f"/v1/attachments/{first['content_hash']}"
+    assert test_client.get(lookup_url, headers=second_headers).json()["id"] == first["id"]
+    response = test_client.get(lookup_url, headers=outsider_headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_cannot_send_attachment_of_another_user(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    attacker = make_user()
+    accomplice = make_user()
+    _, attachment = upload(test_client, owner[1], os.urandom(64))
+    room_id = make_room(attacker, accomplice)
+
+    frame = send_message(attacker[1], room_id, "mine now", attachment_id=attachment["id"])
+    assert frame["type"] == "error"
+
+    object_url = f"/v1/files/{attachment['object_name']}"
+    assert test_client.get(object_url, headers=accomplice[1]).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_member_can_forward_attachment_seen_in_room(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    friend = make_user()
+    _, attachment = upload(test_client, owner[1], os.urandom(64))
+    room_id = make_room(owner, member)
+    assert send_message(owner[1], room_id, "look", attachment_id=attachment["id"])["type"] == (
+        "message"
+    )
+
+    other_room_id = make_room(member, friend)
+    frame = send_message(member[1], other_room_id, "look", attachment_id=attachment["id"])
+    assert frame["type"] == "message"
+    assert frame["message"]["attachment"]["id"] == attachment["id"]
+
+
+def test_deleting_last_message_deletes_attachment(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    _, attachment = upload(test_client, owner[1], os.urandom(64))
+    message = send_message(owner[1], room_id, "look", attachment_id=attachment["id"])["message"]
+
+    response = test_client.delete(f"/v1/messages/{message['id']}", headers=owner[1])
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+    response = test_client.get(f"/v1/attachments/{attachment['content_hash']}", headers=owner[1])
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_unsent_attachments_expire(test_client, make_user, make_room, send_message, monkeypatch):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    _, sent = upload(test_client, owner[1], os.urandom(64))
+    _, unsent = upload(test_client, owner[1], os.urandom(64))
+    send_message(owner[1], room_id, "look", attachment_id=sent["id"])
+
+    monkeypatch.setattr(settings, "UNSENT_ATTACHMENT_TTL_S", 0)
+    assert test_client.portal.call(attachment_service.delete_unsent) >= 1
+
+    sent_url = f"/v1/attachments/{sent['content_hash']}"
+    unsent_url = f"/v1/attachments/{unsent['content_hash']}"
+    assert test_client.get(sent_url, headers=owner[1]).status_code == HTTPStatus.OK
+    assert test_client.get(unsent_url, headers=owner[1]).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_deleting_last_message_keeps_content_another_user_uploaded(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    other = make_user()
+    content = os.urandom(64)
+    room_id = make_room(owner, member)
+    _, attachment = upload(test_client, owner[1], content)
+    message = send_message(owner[1], room_id, "look", attachment_id=attachment["id"])["message"]
+
+    # The same content, uploaded but not sent yet
+    status_code, duplicate = upload(test_client, other[1], content)
+    assert status_code == HTTPStatus.OK
+    assert duplicate["id"] == attachment["id"]
+
+    test_client.delete(f"/v1/messages/{message['id']}", headers=owner[1])
+
+    other_room_id = make_room(other, make_user())
+    frame = send_message(other[1], other_room_id, "mine", attachment_id=duplicate["id"])
+    assert frame["type"] == "message"
+    object_url = f"/v1/files/{duplicate['object_name']}"
+    assert test_client.get(object_url, headers=other[1]).status_code == HTTPStatus.OK
+
+
+def test_cleanup_keeps_running_after_a_failed_pass(monkeypatch):
+    async def run():
+        failed = False
+        retried = asyncio.Event()
+
+        async def delete_unsent():
+            nonlocal failed
+            if not failed:
+                failed = True
+                raise ConnectionError("database went away")
+            retried.set()
+
+        monkeypatch.setattr(AttachmentService, "delete_unsent", staticmethod(delete_unsent))
+        task = asyncio.create_task(attachment_service.run_cleanup())
+        await asyncio.wait_for(retried.wait(), timeout=5)
+        # Runs until cancelled, on shutdown
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+
+    monkeypatch.setattr(settings, "ATTACHMENT_CLEANUP_INTERVAL_S", 0)
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+"""Tests for the session bootstrap endpoint."""
+
+from http import HTTPStatus
+
+
+def room_summary(bootstrap: dict, room_id: int) -> dict:
+    return next(room for room in bootstrap["rooms"] if room["id"] == room_id)
+
+
+def test_bootstrap_counts_unread_messages(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    sent = 3
+    for i in range(sent):
+        last = send_message(owner[1], room_id, f"unread {i}")["message"]
+
+    bootstrap = test_client.get("/v1/bootstrap", headers=member[1]).json()
+    assert bootstrap["user"]["id"] == member[0]["id"]
+    room = room_summary(bootstrap, room_id)
+    assert room["unread_count"] == sent
+    assert room["last_message"]["id"] == last["id"]
+    # Senders have read their own messages
+    owner_bootstrap = test_client.get("/v1/bootstrap", headers=owner[1]).json()
+    assert room_summary(owner_bootstrap, room_id)["unread_count"] == 0
+
+    response = test_client.post(
+        f"/v1/rooms/{room_id}/read", json={"seq": last["seq"] - 1}, headers=member[1]
+    )
+    assert response.status_code == HTTPStatus.OK
+    bootstrap = test_client.get("/v1/bootstrap", headers=member[1]).json()
+    assert room_summary(bootstrap, room_id)["unread_count"] == 1
+
+    # The active room defaults to the most recently active one
+    assert bootstrap["active_room"]["room_id"] == room_id
+    assert bootstrap["active_room"]["messages"][-1]["id"] == last["id"]
+
+
+def test_members_added_later_have_not_missed_earlier_messages(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    late = make_user()
+    room_id = make_room(owner, make_user())
+    send_message(owner[1], room_id, "before you joined")
+    # A second room makes them contacts, so the owner can add them
+    make_room(owner, late)
+
+    response = test_client.post(
+        f"/v1/rooms/{room_id}/members", json={"usernames": [late[0]["username"]]}, headers=owner[1]
+    )
+    assert response.status_code == HTTPStatus.OK
+    bootstrap = test_client.get("/v1/bootstrap", headers=late[1]).json()
+    assert room_summary(bootstrap, room_id)["unread_count"] == 0
+
+    send_message(owner[1], room_id, "after you joined")
+    bootstrap = test_client.get("/v1/bootstrap", headers=late[1]).json()
+    assert room_summary(bootstrap, room_id)["unread_count"] == 1
+
+
+def test_bootstrap_answers_not_modified_until_something_changes(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+
+    response = test_client.get("/v1/bootstrap", headers=member[1])
+    etag = response.headers["etag"]
+    response = test_client.get("/v1/bootstrap", headers={**member[1], "If-None-Match": etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+    send_message(owner[1], room_id, "news")
+    response = test_client.get("/v1/bootstrap", headers={**member[1], "If-None-Match": etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["etag"] != etag
@@ -0,0 +1,63 @@
+"""Tests for the event-loop monitor and the /debug endpoints."""
+
+import asyncio
+import time
+from http import HTTPStatus
+
+from app.core.config import settings
+from app.core.loop_monitor import LoopMonitor
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_loop_monitor_records_the_stack_that_blocked_the_loop(monkeypatch):
+    monkeypatch.setattr(settings, "LOOP_MONITOR_INTERVAL_MS", 10)
+    monkeypatch.setattr(settings, "LOOP_STALL_THRESHOLD_MS", 50)
+
+    async def run() -> LoopMonitor:
+        monitor = LoopMonitor()
+        monitor.start()
+        await asyncio.sleep(0.05)
+        block_the_loop(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    stall = monitor.stalls[-1]
+    assert stall["lag_ms"] >= settings.LOOP_STALL_THRESHOLD_MS
+    assert round(monitor.max_lag * 1000, 1) >= stall["lag_ms"]
+    assert "block_the_loop" in stall["stack"][-1]
+
+
+def test_debug_endpoints_are_for_admins_only(test_client, make_user, monkeypatch):
+    admin, admin_headers = make_user()
+    _, headers = make_user()
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", [admin["username"]])
+
+    response = test_client.get("/v1/debug/event-loop", headers=headers)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = test_client.get("/v1/debug/profile", headers=headers)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+    response = test_client.get("/v1/debug/event-loop", headers=admin_headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["stall_threshold_ms"] == settings.LOOP_STALL_THRESHOLD_MS
+
+    # Longer than allowed is refused before sampling starts
+    response = test_client.get(
+        "/v1/debug/profile",
+        params={"seconds": settings.PROFILER_MAX_SECONDS + 1},
+        headers=admin_headers,
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = test_client.get(
+        "/v1/debug/profile", params={"seconds": 0.2, "interval_ms": 5}, headers=admin_headers
+    )
+    assert response.status_code == HTTPStatus.OK
+    # Collapsed stacks: frames joined by ";", then a sample count
+    lines = response.text.splitlines()
+    assert lines
+    assert all(line.rpartition(" ")[2].isdigit() for line in lines)
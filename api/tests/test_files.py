@@ -0,0 +1,82 @@
+"""Tests for serving stored files."""
+
+import os
+from http import HTTPStatus
+
+from app.core.file_cache import FileCache
+
+
+def upload(test_client, headers: dict, content_type: str = "image/png") -> dict:
+    response = test_client.post(
+        "/v1/attachments",
+        content=os.urandom(64),
+        headers={**headers, "Content-Type": content_type},
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.json()
+
+
+def test_uploader_can_get_file_with_stored_content_type(test_client, make_user):
+    _, headers = make_user()
+    attachment = upload(test_client, headers)
+
+    response = test_client.get(f"/v1/files/{attachment['object_name']}", headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "image/png"
+
+    # A client holding the current ETag gets no body
+    response = test_client.get(
+        f"/v1/files/{attachment['object_name']}",
+        headers={**headers, "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_content_type_does_not_follow_object_name(test_client, make_user):
+    _, headers = make_user()
+    attachment = upload(test_client, headers, content_type="application/octet-stream")
+
+    response = test_client.get(f"/v1/files/{attachment['object_name']}.html", headers=headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    response = test_client.get(f"/v1/files/{attachment['object_name']}", headers=headers)
+    assert response.headers["content-type"] == "application/octet-stream"
+
+
+def test_other_users_cannot_get_unshared_file(test_client, make_user):
+    _, owner_headers = make_user()
+    _, other_headers = make_user()
+    attachment = upload(test_client, owner_headers)
+
+    response = test_client.get(f"/v1/files/{attachment['object_name']}", headers=other_headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_room_members_can_get_file_sent_to_room(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    outsider = make_user()
+    room_id = make_room(owner, member)
+    attachment = upload(test_client, owner[1])
+
+    frame = send_message(owner[1], room_id, "look", attachment_id=attachment["id"])
+    assert frame["type"] == "message"
+
+    object_url = f"/v1/files/{attachment['object_name']}"
+    assert test_client.get(object_url, headers=member[1]).status_code == HTTPStatus.OK
+    assert test_client.get(object_url, headers=outsider[1]).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_cache_index_keeps_one_copy_per_object(tmp_path):
+    older = tmp_path / "key.olddigest"
+    newer = tmp_path / "key.newdigest"
+    older.write_bytes(b"old")
+    newer.write_bytes(b"newer")
+    os.utime(older, (1, 1))
+
+    cache = FileCache(str(tmp_path), max_bytes=1024)
+    cache._load_index()
+    assert list(cache._entries) == ["key"]
+    assert cache._entries["key"].path == newer
+    assert cache._total_bytes == newer.stat().st_size
+    assert not older.exists()
@@ -0,0 +1,120 @@
+"""Tests for the message bus backends."""
+
+import asyncio
+
+import pytest
+
+from app.core.message_bus import (
+    NOTIFY_CHUNK_BYTES,
+    RESUBSCRIBE,
+    InMemoryMessageBus,
+    MessageBus,
+    PostgresMessageBus,
+    RedisMessageBus,
+    ShardedRedisMessageBus,
+    room_channel,
+    split_notify_payload,
+)
+
+
+class FakeCluster:
+    """Records commands the way RedisCluster.execute_command receives them."""
+
+    def __init__(self):
+        self.commands: list[tuple] = []
+
+    def get_node_from_key(self, key: str) -> str:
+        return f"shard-of-{key}"
+
+    async def execute_command(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+        return 1
+
+
+class FakePubSub:
+    """Returns queued messages from get_message, then waits forever."""
+
+    def __init__(self, messages: list[dict]):
+        self.messages = messages
+
+    async def get_message(self, timeout: float):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(timeout)
+        return None
+
+
+def test_sharded_publish_targets_the_room_shard():
+    bus = ShardedRedisMessageBus()
+    bus.cluster = FakeCluster()
+
+    asyncio.run(bus.publish(5, b"event"))
+
+    assert bus.cluster.commands == [
+        (("SPUBLISH", room_channel(5), b"event"), {"target_nodes": "shard-of-room:5"})
+    ]
+
+
+def test_shard_reader_queues_events_and_resubscribes_when_a_slot_moves():
+    bus = ShardedRedisMessageBus()
+    bus._rooms = {5}
+    pubsub = FakePubSub(
+        [
+            {"type": "ssubscribe", "channel": "room:5", "data": 1},
+            {"type": "smessage", "channel": "room:5", "data": "event"},
+            # Unsubscribed on request: the room is no longer tracked
+            {"type": "sunsubscribe", "channel": "room:6", "data": 0},
+            # Dropped by the server while the room is still wanted
+            {"type": "sunsubscribe", "channel": "room:5", "data": 0},
+        ]
+    )
+
+    asyncio.run(asyncio.wait_for(bus._read_shard(pubsub), timeout=5))
+
+    assert bus._events.get_nowait() == "event"
+    assert bus._events.get_nowait() is RESUBSCRIBE
+    assert bus._events.empty()
+
+
+def test_bus_missing_a_method_fails_when_constructed():
+    class PublishOnlyBus(MessageBus):
+        async def listen(self, handler) -> None:
+            pass
+
+        async def publish(self, room_id: int, data: bytes) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="channel_count"):
+        PublishOnlyBus()
+
+    for backend in (
+        InMemoryMessageBus,
+        RedisMessageBus,
+        ShardedRedisMessageBus,
+        PostgresMessageBus,
+    ):
+        backend()
+
+
+def test_large_notify_events_are_split_on_characters_and_reassembled():
+    small = b'{"room_id": 1}\n{"type": "typing"}'
+    assert split_notify_payload(small) == [small.decode()]
+
+    # Two-byte characters at an odd offset, so a chunk limit falls inside one
+    event = ("{" + "é" * NOTIFY_CHUNK_BYTES).encode()
+    payloads = split_notify_payload(event)
+    assert len(payloads) > 1
+    for payload in payloads:
+        assert len(payload.encode()) <= NOTIFY_CHUNK_BYTES + len("#000000000000:0:0:")
+
+    bus = PostgresMessageBus()
+    # Another event's chunk arriving in between does not mix in
+    other_event = "[" + "x" * NOTIFY_CHUNK_BYTES
+    other = split_notify_payload(other_event.encode())
+    received = [bus._reassemble(payloads[0]), bus._reassemble(other[0])]
+    received += [bus._reassemble(payload) for payload in payloads[1:] + other[1:]]
+    assert [payload for payload in received if payload is not None] == [
+        event.decode(),
+        other_event,
+    ]
+    assert not bus._partial
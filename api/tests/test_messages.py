@@ -0,0 +1,122 @@
+"""Tests for sending, editing and deleting messages."""
+
+from http import HTTPStatus
+
+
+def test_messages_get_dense_per_room_seq(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    other_room_id = make_room(member, make_user())
+
+    seqs = [send_message(owner[1], room_id, f"hello {i}")["message"]["seq"] for i in range(3)]
+    assert seqs == [seqs[0], seqs[0] + 1, seqs[0] + 2]
+
+    # Each room counts on its own
+    other = send_message(member[1], other_room_id, "elsewhere")["message"]
+    assert other["seq"] == 1
+
+    response = test_client.get(
+        f"/v1/messages/rooms/{room_id}/range",
+        params={"from_seq": seqs[0]},
+        headers=member[1],
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert [message["seq"] for message in response.json()["messages"]] == seqs
+
+
+def test_edit_and_delete_bump_room_change_version(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    first = send_message(owner[1], room_id, "first")["message"]
+    second = send_message(owner[1], room_id, "second")["message"]
+
+    response = test_client.patch(
+        f"/v1/messages/{first['id']}", json={"content": "edited"}, headers=owner[1]
+    )
+    assert response.status_code == HTTPStatus.OK
+    edited = response.json()
+    assert edited["content"] == "edited"
+    assert edited["seq"] == first["seq"]
+
+    response = test_client.delete(f"/v1/messages/{second['id']}", headers=owner[1])
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+    response = test_client.get(
+        f"/v1/messages/rooms/{room_id}/changes",
+        params={"since_version": 0},
+        headers=member[1],
+    )
+    changes = response.json()
+    assert [change["id"] for change in changes["changes"]] == [first["id"], second["id"]]
+    versions = [change["version"] for change in changes["changes"]]
+    assert versions == [edited["version"], edited["version"] + 1]
+    assert changes["version"] == versions[-1]
+    assert changes["changes"][1]["deleted_at"] is not None
+
+    # Changes after a known version only
+    response = test_client.get(
+        f"/v1/messages/rooms/{room_id}/changes",
+        params={"since_version": edited["version"]},
+        headers=member[1],
+    )
+    assert [change["id"] for change in response.json()["changes"]] == [second["id"]]
+
+
+def test_deleted_message_cannot_be_edited_or_reacted_to(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    message = send_message(owner[1], room_id, "gone soon")["message"]
+    test_client.delete(f"/v1/messages/{message['id']}", headers=owner[1])
+
+    response = test_client.patch(
+        f"/v1/messages/{message['id']}", json={"content": "back"}, headers=owner[1]
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response = test_client.put(f"/v1/messages/{message['id']}/reactions/👍", headers=member[1])
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_timestamps_use_pydantic_utc_format(test_client, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    message = send_message(owner[1], room_id, "when")["message"]
+    assert message["created_at"].endswith("Z")
+
+    # orjson-encoded history and Pydantic-encoded changes agree
+    history = test_client.get(f"/v1/messages/rooms/{room_id}/history", headers=member[1]).json()
+    assert history["messages"][0]["created_at"] == message["created_at"]
+
+    response = test_client.patch(
+        f"/v1/messages/{message['id']}", json={"content": "edited"}, headers=owner[1]
+    )
+    edited_at = response.json()["edited_at"]
+    history = test_client.get(f"/v1/messages/rooms/{room_id}/history", headers=member[1]).json()
+    assert history["messages"][0]["edited_at"] == edited_at
+    assert edited_at.endswith("Z")
+
+
+def test_send_with_same_client_msg_id_is_idempotent(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+
+    first = send_message(owner[1], room_id, "once", client_msg_id="retry-1")["message"]
+    retry = send_message(owner[1], room_id, "once", client_msg_id="retry-1")["message"]
+    assert retry["id"] == first["id"]
+    assert retry["seq"] == first["seq"]
+
+    # The id is scoped to its sender
+    other = send_message(member[1], room_id, "twice", client_msg_id="retry-1")["message"]
+    assert other["id"] != first["id"]
+    assert other["seq"] == first["seq"] + 1
+
+    history = test_client.get(f"/v1/messages/rooms/{room_id}/history", headers=owner[1]).json()
+    assert [message["id"] for message in history["messages"]] == [first["id"], other["id"]]
@@ -0,0 +1,22 @@
+"""Tests for per-request query tracking."""
+
+import asyncio
+
+from app.core.query_stats import create_untracked_task, record_query, track_queries
+
+
+async def query(sql: str) -> None:
+    record_query(sql, 0.001)
+
+
+def test_untracked_tasks_do_not_add_to_request_stats():
+    async def run():
+        with track_queries() as stats:
+            await query("SELECT 1")
+            # Work the request awaits counts, background work does not
+            await asyncio.gather(query("SELECT 2"))
+            await create_untracked_task(query("SELECT 3"))
+        return stats
+
+    stats = asyncio.run(run())
+    assert dict(stats.statements) == {"SELECT ?": 2}
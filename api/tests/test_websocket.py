@@ -0,0 +1,235 @@
+"""Tests for WebSocket delivery: acks, redelivery and reconnects."""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+import msgpack
+import orjson
+import pytest
+
+from app.core.message_bus import InMemoryMessageBus
+from app.core.metrics import PUBSUB_CHANNELS
+from app.domains.auth import websocket_manager
+from app.domains.auth.message_schemas import WSSubscribeMessage
+from app.domains.auth.websocket_manager import (
+    ConnectionManager,
+    batch_frames,
+    encode_frame,
+    encode_room_event,
+    manager,
+    parse_client_frame,
+)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames: list[str | bytes] = []
+
+    async def send_text(self, data: str) -> None:
+        self.frames.append(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.frames.append(data)
+
+
+@pytest.fixture
+def connect(test_client):
+    """Open an authenticated WebSocket for the user, with extra auth frame fields."""
+
+    @contextmanager
+    def open_socket(headers: dict, **auth):
+        token = headers["Authorization"].removeprefix("Bearer ")
+        with test_client.websocket_connect("/v1/messages/ws") as websocket:
+            websocket.send_json({"type": "auth", "token": token, **auth})
+            assert websocket.receive_json()["type"] == "success"
+            yield websocket
+
+    return open_socket
+
+
+def subscribe(websocket, room_id: int) -> None:
+    websocket.send_json({"type": "subscribe", "room_id": room_id})
+    assert websocket.receive_json()["type"] == "success"
+
+
+def test_unacked_messages_are_redelivered_on_reconnect(connect, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+
+    with connect(member[1], ack=True) as websocket:
+        subscribe(websocket, room_id)
+        sent = send_message(owner[1], room_id, "are you there")["message"]
+        assert websocket.receive_json()["message"]["id"] == sent["id"]
+
+    # Not acked: the next connection gets it again, right after authenticating
+    with connect(member[1], ack=True) as websocket:
+        assert websocket.receive_json()["message"]["id"] == sent["id"]
+        websocket.send_json({"type": "ack", "message_ids": [sent["id"]]})
+        subscribe(websocket, room_id)
+
+    with connect(member[1], ack=True) as websocket:
+        # The first frame answers the subscribe, nothing was redelivered
+        subscribe(websocket, room_id)
+
+
+def test_closing_a_replaced_connection_keeps_the_new_one():
+    async def run():
+        manager = ConnectionManager()
+        manager.bus = InMemoryMessageBus()
+        old, new = FakeWebSocket(), FakeWebSocket()
+
+        await manager.connect(old, 1, ack=True)
+        await manager.subscribe_to_room(1, 5)
+        await manager.connect(new, 1, ack=True)
+        await manager.subscribe_to_room(1, 5)
+        manager.pending_frames[1][10] = ('{"type":"message"}', "", "", 2, 5, 1)
+
+        # The old socket's handler only notices it was closed after the reconnect
+        await manager.disconnect(1, old)
+        assert manager.active_connections[1] is new
+        assert manager.user_subscriptions[1] == {5}
+        assert 1 not in manager._pending_expiry
+
+        await manager.send_to_user(1, {"type": "success"})
+        assert len(new.frames) == 1
+        assert not old.frames
+
+        # Closing the current socket starts the pending frames' expiry
+        await manager.disconnect(1, new)
+        assert 1 not in manager.active_connections
+        assert 1 in manager._pending_expiry
+        manager._pending_expiry[1].cancel()
+
+    asyncio.run(run())
+
+
+def test_catch_up_is_not_followed_by_the_same_messages(connect, make_user, make_room, send_message):
+    owner = make_user()
+    member = make_user()
+    friend = make_user()
+    room_id = make_room(owner, member)
+    other_room_id = make_room(member, friend)
+
+    with connect(member[1], ack=True) as websocket:
+        subscribe(websocket, room_id)
+        subscribe(websocket, other_room_id)
+        caught_up = send_message(owner[1], room_id, "in the catch-up")["message"]
+        assert websocket.receive_json()["message"]["id"] == caught_up["id"]
+        not_caught_up = send_message(friend[1], other_room_id, "elsewhere")["message"]
+        assert websocket.receive_json()["message"]["id"] == not_caught_up["id"]
+
+    # Both are unacked, but only the room in last_seen is caught up
+    with connect(member[1], ack=True, last_seen={room_id: 0}) as websocket:
+        frame = websocket.receive_json()
+        assert frame["type"] == "catch_up"
+        assert [m["id"] for m in frame["rooms"][0]["messages"]] == [caught_up["id"]]
+        assert websocket.receive_json()["message"]["id"] == not_caught_up["id"]
+        subscribe(websocket, room_id)
+
+
+def test_frames_held_during_catch_up_skip_only_messages_it_contained(monkeypatch):
+    def event(room_id: int, seq: int) -> bytes:
+        frame = {
+            "type": "message",
+            "room_id": room_id,
+            "seq": seq,
+            "message": {"id": room_id * 10 + seq},
+        }
+        return encode_room_event(room_id, frame, compact_frame=frame, sender={"id": 9})
+
+    async def run():
+        manager = ConnectionManager()
+        manager.bus = InMemoryMessageBus()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, 1)
+        await manager.subscribe_to_rooms(1, [1, 2])
+        manager.hold_frames(1)
+
+        async def get_missed_messages(*args):
+            # Live events arrive out of order across rooms while the catch-up is read
+            for room_id, seq in [(2, 2), (1, 2), (2, 1)]:
+                await manager.handle_event(event(room_id, seq))
+            return []
+
+        # Room 1 is caught up to seq 2, room 2 only to seq 1
+        catch_up = {
+            "type": "catch_up",
+            "rooms": [
+                {"room_id": 1, "messages": [{"seq": 1}, {"seq": 2}], "has_more": False},
+                {"room_id": 2, "messages": [{"seq": 1}], "has_more": False},
+            ],
+        }
+        monkeypatch.setattr(
+            websocket_manager.chat_repository, "get_missed_messages", get_missed_messages
+        )
+        monkeypatch.setattr(manager, "_catch_up_frame", lambda *args: catch_up)
+        await manager.send_catch_up(1, {1: 0, 2: 0})
+
+        frames = [orjson.loads(frame) for frame in websocket.frames]
+        assert [frame["type"] for frame in frames] == ["catch_up", "message"]
+        assert (frames[1]["room_id"], frames[1]["seq"]) == (2, 2)
+        assert 1 not in manager.held_frames
+
+    asyncio.run(run())
+
+
+def test_channel_gauge_follows_a_replaced_bus(monkeypatch):
+    class CountingBus(InMemoryMessageBus):
+        def channel_count(self) -> int:
+            return 7
+
+    monkeypatch.setattr(manager, "bus", CountingBus())
+    assert PUBSUB_CHANNELS.collect()[0].samples[0].value == CountingBus().channel_count()
+
+
+def test_frames_encode_as_json_or_msgpack_and_batch_without_reencoding():
+    frame = {"type": "message", "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)}
+    text = encode_frame(frame, binary=False)
+    packed = encode_frame(frame, binary=True)
+    # Datetimes look the same in both formats
+    assert msgpack.unpackb(packed) == orjson.loads(text)
+
+    assert batch_frames([text]) is text
+    assert orjson.loads(batch_frames([text, text])) == [orjson.loads(text)] * 2
+    assert msgpack.unpackb(batch_frames([packed, packed])) == [msgpack.unpackb(packed)] * 2
+
+    expected = WSSubscribeMessage(type="subscribe", room_id=5)
+    assert parse_client_frame('{"type": "subscribe", "room_id": 5}') == expected
+    assert parse_client_frame(msgpack.packb({"type": "subscribe", "room_id": 5})) == expected
+    with pytest.raises(ValueError):
+        parse_client_frame(b"\xc1")
+
+
+def test_compact_msgpack_connection_gets_each_sender_once(
+    test_client, make_user, make_room, send_message
+):
+    owner = make_user()
+    member = make_user()
+    room_id = make_room(owner, member)
+    token = member[1]["Authorization"].removeprefix("Bearer ")
+
+    def send(websocket, frame: dict) -> None:
+        websocket.send_bytes(msgpack.packb(frame))
+
+    def receive(websocket) -> dict:
+        return msgpack.unpackb(websocket.receive_bytes())
+
+    with test_client.websocket_connect(
+        "/v1/messages/ws", subprotocols=["chat.json", "chat.msgpack"]
+    ) as websocket:
+        send(websocket, {"type": "auth", "token": token, "compact": True})
+        assert receive(websocket)["type"] == "success"
+        send(websocket, {"type": "subscribe", "room_id": room_id})
+        assert receive(websocket)["type"] == "success"
+
+        sent = [send_message(owner[1], room_id, text)["message"] for text in ("one", "two")]
+        frames = [receive(websocket) for _ in range(3)]
+
+    assert [frame["type"] for frame in frames] == ["users", "message", "message"]
+    assert frames[0]["users"][str(owner[0]["id"])]["username"] == owner[0]["username"]
+    for frame, message in zip(frames[1:], sent, strict=True):
+        assert frame["message"]["id"] == message["id"]
+        assert frame["message"]["sender_id"] == owner[0]["id"]
+        assert "sender" not in frame["message"]